@@ -1,58 +1,434 @@
 # Este programa pretende automatizar el proceso de descarga
 # de archivos de algún sitio de internet
+#
+# Abre varias sesiones de Chrome (sin ventana) que se reparten
+# los archivos .smi; cada sesión se reutiliza para todos los
+# archivos que le tocan en lugar de abrir un navegador por archivo.
+#
+# Cada sesión descarga a su propia carpeta, que se vigila para saber
+# en cuanto termina la descarga (el .crdownload desaparece) en lugar
+# de esperar un tiempo fijo. El archivo terminado se renombra como
+# el .smi de donde salió.
+#
+# El estado de cada archivo se guarda en la carpeta de descargas
+# (download_jobs.py): si algo falla se reintenta más tarde, y si el
+# programa se interrumpe, la siguiente corrida sigue donde se quedó.
+#
+# Con --batch-size N se mandan varias moléculas (de varios .smi) en un
+# solo envío y el CSV que regresa se reparte de nuevo por archivo
+# usando la columna Query, que repite el SMILES de cada fila. Si un
+# envío así falla, sus archivos se mandan de nuevo uno por uno y el
+# intento solo cuenta para el que falle solo.
+# Para probar sin tocar el sitio real: python mock_swisstarget.py
+#
+# selenium se importa solo al abrir un navegador: las funciones para
+# leer .smi y repartir CSVs se pueden usar sin tenerlo instalado.
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import argparse
+import csv
+import threading
 import time
 import os
+from collections import namedtuple
 
-# Set up Chrome options for automatic downloads
-DOWNLOAD_DIR = r"C:\Users\shipp\Desktop\Sitio de pruebas_descargador"  # Replace with your actual download path
-chrome_options = webdriver.ChromeOptions()
-chrome_options.add_experimental_option('prefs', {
-    "download.default_directory": DOWNLOAD_DIR,
-    "download.prompt_for_download": False,
-    "download.directory_upgrade": True,
-    "safebrowsing.enabled": True
-})
-
-# Initialize WebDriver with Chrome options
-driver = webdriver.Chrome(options=chrome_options)
-wait = WebDriverWait(driver, 10)  # Set an explicit wait time for elements to load
-
-# Define a function to automate input and download
-def automate_input_and_download(input_file_path):
-    # Open the target website
-    driver.get("http://www.swisstargetprediction.ch/")  # Replace with the actual URL
+from download_jobs import JobQueue, RateLimiter, DEFAULT_DB_NAME, DOWNLOADED, PENDING, SUBMITTED, FAILED
 
+try:
+    # Opcional (solo Linux): avisa del archivo terminado sin tener que revisar la carpeta
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+TARGET_URL = "http://www.swisstargetprediction.ch/"  # Replace with the actual URL
+DEFAULT_SESSIONS = 4
+DOWNLOAD_TIMEOUT = 120   # segundos para que termine una descarga
+DOWNLOAD_RETRIES = 2     # reintentos si la descarga no llega
+POLL_INTERVAL = 0.1
+BATCH_KEY_COLUMN = 'Query'  # columna del CSV con el SMILES de cada fila
+
+# Extensiones de descargas a medias (Chrome, Firefox, Edge)
+PARTIAL_SUFFIXES = ('.crdownload', '.part', '.tmp', '.download')
+
+
+# downloaded: terminados (de esta corrida o de antes); failures: [(nombre, intentos, error)];
+# unfinished: los que quedaron sin terminar porque ninguna sesión siguió trabajando
+DownloadSummary = namedtuple('DownloadSummary', ['downloaded', 'failures', 'unfinished'])
+
+
+class DownloadTimeout(Exception):
+    """La descarga no terminó a tiempo."""
+
+
+class DownloadWatcher:
+    """Vigila una carpeta de descargas y avisa cuando aparece un archivo terminado.
+
+    Hay que llamar start() antes de dar clic en descargar y wait() después.
+    Usa inotify si está instalado (inotify_simple) y si no, revisa la
+    carpeta cada POLL_INTERVAL segundos.
+    """
+
+    def __init__(self, download_dir):
+        self.download_dir = download_dir
+        self.before = set()
+        self.inotify = None
+
+    def start(self):
+        self.before = set(os.listdir(self.download_dir))
+        if INotify is not None and self.inotify is None:
+            try:
+                self.inotify = INotify()
+                self.inotify.add_watch(self.download_dir, inotify_flags.MOVED_TO | inotify_flags.CLOSE_WRITE)
+            except OSError:
+                self.inotify = None
+        elif self.inotify is not None:
+            self.inotify.read(timeout=0)  # Descarta eventos viejos
+
+    def _finished(self):
+        names = set(os.listdir(self.download_dir)) - self.before
+        if any(name.endswith(PARTIAL_SUFFIXES) for name in names):
+            return None
+        complete = sorted(names)
+        return os.path.join(self.download_dir, complete[0]) if complete else None
+
+    def wait(self, timeout=DOWNLOAD_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while True:
+            path = self._finished()
+            if path is not None:
+                return path
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DownloadTimeout(f"La descarga no terminó en {timeout} segundos")
+            if self.inotify is not None:
+                self.inotify.read(timeout=int(min(remaining, 1) * 1000))
+            else:
+                time.sleep(min(POLL_INTERVAL, remaining))
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+
+
+def make_driver(download_dir, headless=True):
+    from selenium import webdriver
+
+    # Set up Chrome options for automatic downloads
+    chrome_options = webdriver.ChromeOptions()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_experimental_option('prefs', {
+        "download.default_directory": download_dir,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": True
+    })
+
+    driver = webdriver.Chrome(options=chrome_options)
+    if headless:
+        # En modo headless Chrome ignora las preferencias de descarga si no se le dice explícitamente
+        driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_dir})
+    return driver
+
+
+class BrowserSession:
+    """Un navegador abierto que se reutiliza para enviar varios archivos."""
+
+    def __init__(self, download_dir, url=TARGET_URL, headless=True, timeout=10):
+        os.makedirs(download_dir, exist_ok=True)
+        self.download_dir = download_dir
+        self.url = url
+        self.headless = headless
+        self.timeout = timeout
+        self._discard_leftovers()
+        self._open_browser()
+        self.watcher = DownloadWatcher(download_dir)
+
+    def _open_browser(self):
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        self.driver = make_driver(self.download_dir, headless=self.headless)
+        self.wait = WebDriverWait(self.driver, self.timeout)  # Set an explicit wait time for elements to load
+
+    def _discard_leftovers(self):
+        # Lo que haya en la carpeta de la sesión es de un envío abandonado; si se
+        # quedara, al terminar se confundiría con la descarga del siguiente archivo
+        for name in os.listdir(self.download_dir):
+            try:
+                os.remove(os.path.join(self.download_dir, name))
+            except OSError:
+                pass
+
+    def restart(self):
+        """Cierra el navegador (y con él cualquier descarga en curso) y abre otro con la carpeta vacía."""
+        try:
+            self.driver.quit()
+        except Exception:
+            pass  # Si ya estaba muerto no importa
+        self._discard_leftovers()
+        self._open_browser()
+
+    def submit(self, file_contents):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+
+        # Open the target website
+        self.driver.get(self.url)
+
+        # Find the input box and send the text content from the file
+        input_box = self.wait.until(EC.presence_of_element_located((By.ID, "smilesBox")))  # Using ID as per your HTML example
+        input_box.clear()  # Clear any existing text in the box
+        input_box.send_keys(file_contents)  # Enter the text contents of the file
+
+        # Find and click the submit button
+        submit_button = self.driver.find_element(By.ID, "submitButton")  # Replace with actual button ID
+        submit_button.click()
+
+        # Wait for the download link to appear and click it
+        download_link = self.wait.until(
+            EC.presence_of_element_located((By.CLASS_NAME, "buttons-csv")))  # Replace with actual download link ID
+        download_link.click()
+
+    def fetch(self, file_contents, timeout=DOWNLOAD_TIMEOUT, retries=DOWNLOAD_RETRIES):
+        """Envía el texto y regresa la ruta de la descarga terminada (en la carpeta de la sesión)."""
+        from selenium.common.exceptions import WebDriverException
+
+        for attempt in range(retries + 1):
+            self.watcher.start()
+            try:
+                self.submit(file_contents)
+                return self.watcher.wait(timeout)
+            except (DownloadTimeout, WebDriverException) as e:
+                if attempt == retries:
+                    raise
+                print(f"Reintentando envío ({e.__class__.__name__})")
+                # La descarga abandonada podría terminar durante el reintento
+                self.restart()
+
+    def download(self, file_contents, output_stem, timeout=DOWNLOAD_TIMEOUT, retries=DOWNLOAD_RETRIES):
+        """Envía el texto y mueve la descarga terminada a output_stem + su extensión."""
+        downloaded = self.fetch(file_contents, timeout=timeout, retries=retries)
+        output_path = output_stem + os.path.splitext(downloaded)[1]
+        os.replace(downloaded, output_path)
+        return output_path
+
+    def close(self):
+        self.watcher.close()
+        try:
+            self.driver.quit()
+        except Exception:
+            pass  # Chrome pudo haber muerto ya; lo que importa es que el hilo siga
+        # La carpeta de la sesión solo queda si hay descargas huérfanas
+        if not os.listdir(self.download_dir):
+            os.rmdir(self.download_dir)
+
+
+def read_input(input_file_path):
     # Read the file contents if input is a file, otherwise treat it as text
     if os.path.isfile(input_file_path):  # Check if the input is a file path
         with open(input_file_path, 'r') as file:
-            file_contents = file.read()
-    else:
-        file_contents = input_file_path  # Use input directly if it's not a file path
+            return file.read()
+    return input_file_path  # Use input directly if it's not a file path
+
+
+# Define a function to automate input and download (one file, no queue)
+def automate_input_and_download(session, input_file_path, output_dir):
+    output_stem = os.path.join(output_dir, os.path.splitext(os.path.basename(input_file_path))[0])
+    return session.download(read_input(input_file_path), output_stem)
+
+
+def read_molecules(input_file_path):
+    """Las moléculas de un .smi: el primer campo de cada línea no vacía."""
+    molecules = []
+    for line in read_input(input_file_path).splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            molecules.append(line.split()[0])
+    return molecules
+
+
+def split_batch_csv(csv_path, groups, output_dir, key_column=BATCH_KEY_COLUMN):
+    """Reparte el CSV de un envío con varias moléculas en un CSV por archivo .smi.
+
+    groups es {nombre del .smi: [moléculas]}; cada fila va al archivo cuya
+    molécula aparece en la columna key_column. Regresa {nombre: ruta de salida}.
+    """
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        if key_column not in header:
+            raise ValueError(f"El CSV no tiene la columna '{key_column}' para separar las moléculas")
+        key = header.index(key_column)
+
+        # Una misma molécula puede venir en varios archivos: sus filas van a todos
+        owners = {}
+        for name, molecules in groups.items():
+            for molecule in molecules:
+                owners.setdefault(molecule, []).append(name)
+        rows = {name: [] for name in groups}
+        for row in reader:
+            if not row:
+                continue
+            names = owners.get(row[key].strip())
+            if names is None:
+                raise ValueError(f"Fila con una molécula que no se envió: {row[key]!r}")
+            for name in dict.fromkeys(names):
+                rows[name].append(row)
+
+    outputs = {}
+    for name, name_rows in rows.items():
+        output_path = os.path.join(output_dir, os.path.splitext(name)[0] + '.csv')
+        tmp_path = output_path + '.tmp'
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(name_rows)
+        os.replace(tmp_path, output_path)
+        outputs[name] = output_path
+    return outputs
+
+
+def _fail(jobs, name, error):
+    """Anota el error en la cola (que decide si se reintenta) y lo reporta."""
+    state = jobs.mark_failed(name, error)
+    what = "falló definitivamente" if state == FAILED else "se reintentará"
+    print(f"Error con {name} ({what}): {error.__class__.__name__}: {error}")
+
+
+def _claim_batch(jobs, batch_size, solo=()):
+    """Toma archivos de la cola hasta juntar batch_size moléculas.
 
-    # Find the input box and send the text content from the file
-    input_box = wait.until(EC.presence_of_element_located((By.ID, "smilesBox")))  # Using ID as per your HTML example
-    input_box.clear()  # Clear any existing text in the box
-    input_box.send_keys(file_contents)  # Enter the text contents of the file
+    Los nombres en solo (estuvieron en un lote que falló) van siempre en
+    un envío propio.
+    """
+    batch = []
+    count = 0
+    while count < batch_size:
+        job = jobs.claim()
+        if job is None:
+            break
+        if batch and job[0] in solo:
+            jobs.release(job[0])
+            break
+        try:
+            molecules = read_molecules(job[1])
+        except Exception as e:
+            # Ya está tomado: si no se anota, se queda 'submitted' para siempre
+            _fail(jobs, job[0], e)
+            continue
+        if batch and count + len(molecules) > batch_size:
+            jobs.release(job[0])
+            break
+        batch.append((job[0], job[1], molecules))
+        count += len(molecules)
+        if job[0] in solo:
+            break
+    return batch
 
-    # Find and click the submit button
-    submit_button = driver.find_element(By.ID, "submitButton")  # Replace with actual button ID
-    submit_button.click()
 
-    # Wait for the download link to appear and click it
-    download_link = wait.until(
-        EC.presence_of_element_located((By.CLASS_NAME, "buttons-csv")))  # Replace with actual download link ID
-    download_link.click()
+def _process(session, batch, output_dir, key_column):
+    """Envía un lote; regresa {nombre: ruta de salida}."""
+    if len(batch) == 1:
+        name, file_path, molecules = batch[0]
+        output_stem = os.path.join(output_dir, os.path.splitext(name)[0])
+        # Los reintentos los lleva la cola, con espera entre uno y otro
+        return {name: session.download(read_input(file_path), output_stem, retries=0)}
 
-    # Wait a few seconds to ensure the download completes
-    time.sleep(5)
+    groups = {name: molecules for name, file_path, molecules in batch}
+    contents = '\n'.join(dict.fromkeys(molecule for molecules in groups.values() for molecule in molecules))
+    downloaded = session.fetch(contents, retries=0)
+    try:
+        return split_batch_csv(downloaded, groups, output_dir, key_column)
+    finally:
+        os.remove(downloaded)
 
 
-def file_reader(folder):
+def _worker(number, jobs, limiter, output_dir, url, headless, batch_size, key_column, solo):
+    from selenium.common.exceptions import WebDriverException
+
+    session = None
+    try:
+        while True:
+            batch = _claim_batch(jobs, batch_size, solo)
+            if not batch:
+                wait = jobs.next_ready_in()
+                if wait is None:
+                    return
+                time.sleep(min(wait, 1.0))
+                continue
+
+            names = [name for name, file_path, molecules in batch]
+            try:
+                if session is None:
+                    session = BrowserSession(os.path.join(output_dir, f".sesion_{number}"), url=url, headless=headless)
+                limiter.acquire()
+                outputs = _process(session, batch, output_dir, key_column)
+            except Exception as e:
+                if len(names) > 1:
+                    # No se sabe de quién fue la culpa (una molécula mala, una fila que
+                    # no se pudo repartir): cada uno se vuelve a mandar solo y el
+                    # intento solo se le cobra al que falle por su cuenta
+                    for name in names:
+                        solo.add(name)
+                        jobs.release(name)
+                    print(f"Falló un envío de {len(names)} archivos ({e.__class__.__name__}: {e}); "
+                          f"se mandarán uno por uno")
+                else:
+                    _fail(jobs, names[0], e)
+                if isinstance(e, (WebDriverException, DownloadTimeout)) and session is not None:
+                    # El navegador pudo quedar en mal estado, o con una descarga a medias
+                    # que terminaría a nombre del siguiente archivo: se abre otro limpio
+                    session.close()
+                    session = None
+                continue
+
+            for name, output_path in outputs.items():
+                jobs.mark_downloaded(name, output_path)
+                print(f"Descargado: {name} -> {os.path.basename(output_path)}")
+    finally:
+        if session is not None:
+            session.close()
+
+
+def download_files(files, output_dir, sessions=DEFAULT_SESSIONS, url=TARGET_URL, headless=True,
+                   per_minute=None, max_attempts=5, retry_failed=False, batch_size=1,
+                   key_column=BATCH_KEY_COLUMN):
+    """Reparte los archivos entre varias sesiones de navegador.
+
+    Con batch_size > 1 cada envío junta hasta batch_size moléculas de
+    varios archivos y el CSV resultante se separa por archivo.
+
+    El estado de cada archivo queda en output_dir/.descargas.sqlite, así que
+    otra corrida sobre la misma carpeta retoma solo lo que no se terminó.
+    Regresa un DownloadSummary contado desde la cola, no desde lo que se intentó.
+    """
+    jobs = JobQueue(os.path.join(output_dir, DEFAULT_DB_NAME), max_attempts=max_attempts)
+    limiter = RateLimiter(per_minute)
+    solo = set()  # compartido por las sesiones: archivos que ya no van en lote
+    try:
+        jobs.sync(files, retry_failed=retry_failed)
+        pending = jobs.counts().get(PENDING, 0)
+        if pending < len(files):
+            print(f"{len(files) - pending} archivos ya estaban terminados de una corrida anterior.")
+
+        threads = [
+            threading.Thread(target=_worker, args=(number, jobs, limiter, output_dir, url, headless,
+                                                  batch_size, key_column, solo), daemon=True)
+            for number in range(max(1, min(sessions, pending)))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counts = jobs.counts()
+        return DownloadSummary(counts.get(DOWNLOADED, 0), jobs.failures(),
+                               counts.get(PENDING, 0) + counts.get(SUBMITTED, 0))
+    finally:
+        jobs.close()
+
+
+def file_reader(folder, sessions=DEFAULT_SESSIONS, headless=True, url=TARGET_URL, per_minute=None,
+                max_attempts=5, retry_failed=False, batch_size=1, key_column=BATCH_KEY_COLUMN):
     if not os.path.isdir(folder):
         print(f"{folder} no es un directorio válido")
         return
@@ -60,40 +436,53 @@ def file_reader(folder):
     # Toma el nombre del folder y crea uno nuevo con el sufijo '_descargas'
     folder_name = os.path.basename(os.path.normpath(folder))
     new_folder_name = f"{folder_name}_descargas"
-    new_folder_path = os.path.join(os.path.dirname(folder), new_folder_name)
+    new_folder_path = os.path.join(os.path.dirname(os.path.normpath(folder)), new_folder_name)
 
     # Crea un nuevo folder si no existe
     os.makedirs(new_folder_path, exist_ok=True)
 
     # Lista todos los archivos .smi en el folder
-    files = [f for f in os.listdir(folder) if f.endswith('.smi')]
+    files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith('.smi'))
 
     if not files:
         print("No hay archivos .smi en el folder especificado.")
         return
 
-    # Set up Chrome options for automatic downloads
-    DOWNLOAD_DIR = new_folder_path  # Replace with your actual download path
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_experimental_option('prefs', {
-        "download.default_directory": DOWNLOAD_DIR,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True
-    })
+    summary = download_files(files, os.path.abspath(new_folder_path), sessions=sessions, url=url,
+                             headless=headless, per_minute=per_minute, max_attempts=max_attempts,
+                             retry_failed=retry_failed, batch_size=batch_size, key_column=key_column)
 
-    # Initialize WebDriver with Chrome options
-    driver = webdriver.Chrome(options=chrome_options)
-    wait = WebDriverWait(driver, 10)  # Set an explicit wait time for elements to load
+    print(f"\n{summary.downloaded} de {len(files)} archivos descargados en {new_folder_path}")
+    for name, attempts, error in summary.failures:
+        print(f"  Falló: {name} ({attempts} intentos): {error}")
+    if summary.unfinished:
+        print(f"  {summary.unfinished} archivos quedaron sin terminar; vuelve a correr para seguir con ellos.")
+    return summary
 
-    for file in files:
-        file_path = os.path.join(folder, file)  # Get full path of each file
-        automate_input_and_download(file_path)
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Envía archivos .smi a un sitio y descarga los resultados.")
+    parser.add_argument('folder', nargs='?', help="carpeta con los archivos .smi (si falta, se pregunta)")
+    parser.add_argument('--url', default=TARGET_URL, help="sitio destino (p. ej. el de mock_swisstarget.py)")
+    parser.add_argument('-s', '--sessions', type=int, default=DEFAULT_SESSIONS, help="navegadores simultáneos")
+    parser.add_argument('--per-minute', type=float, help="máximo de envíos por minuto hacia el sitio")
+    parser.add_argument('--attempts', type=int, default=5, help="intentos por archivo antes de darlo por fallido")
+    parser.add_argument('--retry-failed', action='store_true', help="vuelve a intentar los que ya fallaron")
+    parser.add_argument('-b', '--batch-size', type=int, default=1,
+                        help="moléculas por envío, juntando varios archivos (1 = un archivo por envío)")
+    parser.add_argument('--batch-key-column', default=BATCH_KEY_COLUMN,
+                        help="columna del CSV que dice de qué molécula es cada fila")
+    parser.add_argument('--show', action='store_true', help="muestra las ventanas de Chrome")
+    args = parser.parse_args(argv)
 
-smiles_folder = input('Pega la ruta del folder donde están los archivos .smi:').strip().strip('"').strip("'")
-file_reader(smiles_folder)
+    smiles_folder = args.folder or input('Pega la ruta del folder donde están los archivos .smi:')
+    smiles_folder = smiles_folder.strip().strip('"').strip("'")
+    summary = file_reader(smiles_folder, sessions=args.sessions, headless=not args.show, url=args.url,
+                          per_minute=args.per_minute, max_attempts=args.attempts,
+                          retry_failed=args.retry_failed, batch_size=args.batch_size,
+                          key_column=args.batch_key_column)
+    return 1 if summary and (summary.failures or summary.unfinished) else 0
 
-# Close the browser when done
-driver.quit()
 
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,30 +1,19 @@
-from PyPDF2 import PdfReader, PdfWriter
-import os
+"""
+Quita los metadatos de un PDF y lo comprime.
 
-def remove_metadata_and_compress(file_path):
-    pdf_writer = PdfWriter()
-    pdf_reader = PdfReader(file_path)
+El trabajo de verdad (reducir y recodificar imágenes, comprimir
+los flujos de contenido) lo hace pdf_compress.py; este script
+queda como atajo que pregunta la ruta.
+"""
 
-    for page in pdf_reader.pages:
-        pdf_writer.add_page(page)
+from pdf_compress import compress_pdf, print_report
 
-    # Remove metadata
-    pdf_writer.add_metadata({})
 
-    # Attempt to compress the output PDF by reducing image quality (basic compression)
-    pdf_writer._root_object.update({
-        "/Filter": "/FlateDecode",
-        "/BitsPerComponent": 1  # This will reduce image quality to make the file lighter
-    })
+def remove_metadata_and_compress(file_path, **options):
+    result = compress_pdf(file_path, **options)
+    print_report(result)
+    return result
 
-    # Set the output file path with '_compressed' suffix
-    output_file_path = os.path.splitext(file_path)[0] + "_compressed.pdf"
-
-    # Write the output PDF
-    with open(output_file_path, 'wb') as out_file:
-        pdf_writer.write(out_file)
-
-    print(f'Metadata removed and file compressed. Output saved to: {output_file_path}')
 
 if __name__ == "__main__":
     # Prompt the user for a file path
@@ -1,10 +1,21 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
 from collections import Counter
-import numpy as np
 from datetime import datetime
 import os
+import sys
+
+# pandas y matplotlib tardan en cargar: se importan al crear el primer analizador
+pd = None
+plt = None
+
+
+def _load_libraries():
+    global pd, plt
+    import pandas as pd
+    import matplotlib
+    if 'matplotlib.pyplot' not in sys.modules:
+        matplotlib.use('Agg')  # solo se guardan imágenes, no hace falta ventana
+    import matplotlib.pyplot as plt
 
 
 class MusicListeningAnalyzer:
@@ -24,6 +35,7 @@ class MusicListeningAnalyzer:
         file_path : str
             Path to the CSV file containing listening data
         """
+        _load_libraries()
         self.file_path = file_path
         self.df = None
         self.monthly_data = {}
@@ -503,14 +515,24 @@ class MusicListeningAnalyzer:
         plt.close()
 
 
-# Example usage
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analiza el historial de escucha exportado en CSV.")
+    parser.add_argument('csv', nargs='?', help="archivo CSV (si falta, se pregunta)")
+    args = parser.parse_args(argv)
+
+    file_path = args.csv or input("Indica la ruta al archivo csv: ")
+    file_path = file_path.strip().strip("'").strip('"').strip()
     try:
-        file_path = input("Indica la ruta al archivo csv: ").strip("'").strip('"').strip()
         analyzer = MusicListeningAnalyzer(file_path)
         analyzer.analyze()
     except Exception as e:
         print(f"An error occurred: {e}")
         import traceback
 
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,194 @@
+"""
+Documentos sintéticos para medir las herramientas sin usar
+archivos reales (ni datos personales).
+
+- PDFs escaneados: páginas-imagen (JPEG) con bloques de "texto"
+- PDFs digitales: texto en flujos de contenido sin comprimir,
+  con fuente estándar y un logo repetido en cada página
+- CFDI: facturas XML con timbre y un número variable de conceptos
+
+Todo sale de una semilla fija, así que dos corridas generan lo
+mismo. ensure_fixtures solo regenera si cambió el perfil.
+
+Uso:
+    python bench_fixtures.py carpeta [--profile small|medium|large]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import uuid
+from xml.sax.saxutils import quoteattr
+
+PROFILES = {
+    'small': dict(scanned_docs=4, scanned_pages=3, digital_docs=10, digital_pages=10,
+                  cfdi_files=500, cfdi_max_concepts=50, dpi=200),
+    'medium': dict(scanned_docs=20, scanned_pages=5, digital_docs=50, digital_pages=20,
+                   cfdi_files=5000, cfdi_max_concepts=200, dpi=300),
+    'large': dict(scanned_docs=100, scanned_pages=10, digital_docs=200, digital_pages=50,
+                  cfdi_files=50000, cfdi_max_concepts=2000, dpi=300),
+}
+FIXTURES_VERSION = 2
+STAMP_NAME = 'fixtures.json'
+SEED = 1234
+
+LETTER = (8.5, 11)  # pulgadas
+WORDS = ("factura contrato anexo cliente proveedor pago total fecha servicio "
+         "periodo importe concepto cantidad unidad descripción firma").split()
+COMPANIES = ["ACME SA DE CV", "COMERCIALIZADORA DEL NORTE", "SERVICIOS INTEGRALES MX",
+             "DISTRIBUIDORA LA PAZ", "TRANSPORTES RAPIDOS", "PAPELERIA CENTRAL",
+             "CONSULTORES ASOCIADOS", "FERRETERIA EL MARTILLO"]
+MY_NAME = "JUAN PEREZ LOPEZ"
+
+
+def make_scanned_pdf(path, pages, dpi, rng):
+    """Un PDF de páginas escaneadas: ruido de papel y renglones oscuros, como JPEG."""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    size = (int(LETTER[0] * dpi), int(LETTER[1] * dpi))
+    images = []
+    for _ in range(pages):
+        image = Image.effect_noise(size, 12).point(lambda v: 215 + v // 8)
+        draw = ImageDraw.Draw(image)
+        line = dpi // 6
+        for y in range(dpi, size[1] - dpi, line):
+            x = dpi
+            while x < size[0] - dpi:
+                width = rng.randint(dpi // 8, dpi // 2)
+                draw.rectangle([x, y, min(x + width, size[0] - dpi), y + line // 2], fill=rng.randint(20, 80))
+                x += width + dpi // 12
+        images.append(image.filter(ImageFilter.BLUR).convert('RGB'))
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=dpi, quality=90)
+
+
+def make_digital_pdf(path, pages, rng, logo):
+    """Un PDF "nacido digital": texto con Helvetica y el mismo logo en cada página."""
+    from PyPDF2 import PageObject, PdfWriter
+    from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+    }))
+    logo_ref = writer._add_object(logo)
+    for _ in range(pages):
+        # add_page regresa la copia que queda en el writer (add_blank_page no)
+        page = writer.add_page(PageObject.create_blank_page(None, 612, 792))
+        lines = [b"q 80 0 0 40 490 730 cm /Logo Do Q", b"BT /F1 10 Tf 12 TL 72 720 Td"]
+        for _ in range(50):
+            text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 12)))
+            lines.append(f"({text}) '".encode('latin-1'))
+        lines.append(b"ET")
+        content = DecodedStreamObject()
+        content._data = b"\n".join(lines)
+        page[NameObject('/Contents')] = writer._add_object(content)
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): font}),
+            NameObject('/XObject'): DictionaryObject({NameObject('/Logo'): logo_ref}),
+        })
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def _logo_stream():
+    """Un logo RGB sin comprimir (200x100), como los que se repiten en cada página."""
+    from PyPDF2.generic import DecodedStreamObject, NameObject, NumberObject
+
+    logo = DecodedStreamObject()
+    logo._data = bytes((x * 7 + y * 3) % 256 for y in range(100) for x in range(200) for _ in range(3))
+    logo.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Image'),
+        NameObject('/Width'): NumberObject(200),
+        NameObject('/Height'): NumberObject(100),
+        NameObject('/ColorSpace'): NameObject('/DeviceRGB'),
+        NameObject('/BitsPerComponent'): NumberObject(8),
+    })
+    return logo
+
+
+def make_cfdi(path, concepts, rng):
+    """Una factura CFDI 4.0 con timbre; emitida o recibida por MY_NAME al azar."""
+    other = rng.choice(COMPANIES)
+    emisor, receptor = (MY_NAME, other) if rng.random() < 0.3 else (other, MY_NAME)
+    rfc = {name: ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(4)) + '800101AB1'
+           for name in (emisor, receptor)}
+    fecha = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(8, 19):02d}:00:00"
+    lines = []
+    total = 0.0
+    for n in range(concepts):
+        importe = round(rng.uniform(10, 5000), 2)
+        total += importe
+        lines.append(f'    <cfdi:Concepto ClaveProdServ="01010101" Cantidad="1" ClaveUnidad="H87" '
+                     f'Descripcion={quoteattr(" ".join(rng.choice(WORDS) for _ in range(5)))} '
+                     f'ValorUnitario="{importe:.2f}" Importe="{importe:.2f}" ObjetoImp="01"/>')
+    xml = f'''<?xml version="1.0" encoding="UTF-8"?>
+<cfdi:Comprobante xmlns:cfdi="http://www.sat.gob.mx/cfd/4" xmlns:tfd="http://www.sat.gob.mx/TimbreFiscalDigital" Version="4.0" Fecha="{fecha}" SubTotal="{total:.2f}" Moneda="MXN" Total="{total:.2f}" TipoDeComprobante="I" Exportacion="01" LugarExpedicion="01000">
+  <cfdi:Emisor Rfc="{rfc[emisor]}" Nombre={quoteattr(emisor)} RegimenFiscal="601"/>
+  <cfdi:Receptor Rfc="{rfc[receptor]}" Nombre={quoteattr(receptor)} DomicilioFiscalReceptor="01000" RegimenFiscalReceptor="612" UsoCFDI="G03"/>
+  <cfdi:Conceptos>
+{chr(10).join(lines)}
+  </cfdi:Conceptos>
+  <cfdi:Complemento>
+    <tfd:TimbreFiscalDigital Version="1.1" UUID="{uuid.UUID(int=rng.getrandbits(128))}" FechaTimbrado="{fecha}"/>
+  </cfdi:Complemento>
+</cfdi:Comprobante>
+'''
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(xml)
+
+
+def generate(root, profile='small'):
+    """Genera todos los documentos del perfil en root (scanned/, digital/, cfdi/)."""
+    params = PROFILES[profile]
+    rng = random.Random(SEED)
+    for sub in ('scanned', 'digital', 'cfdi'):
+        shutil.rmtree(os.path.join(root, sub), ignore_errors=True)
+        os.makedirs(os.path.join(root, sub))
+
+    for n in range(params['scanned_docs']):
+        make_scanned_pdf(os.path.join(root, 'scanned', f'escaneo_{n:04d}.pdf'),
+                         params['scanned_pages'], params['dpi'], rng)
+    for n in range(params['digital_docs']):
+        make_digital_pdf(os.path.join(root, 'digital', f'digital_{n:04d}.pdf'),
+                         params['digital_pages'], rng, _logo_stream())
+    for n in range(params['cfdi_files']):
+        # Tamaños muy dispares: la mayoría chicas, algunas enormes
+        concepts = max(1, int(rng.paretovariate(1.2))) % params['cfdi_max_concepts'] + 1
+        make_cfdi(os.path.join(root, 'cfdi', f'{uuid.UUID(int=rng.getrandbits(128))}.xml'), concepts, rng)
+
+    stamp = dict(params, profile=profile, version=FIXTURES_VERSION)
+    with open(os.path.join(root, STAMP_NAME), 'w') as f:
+        json.dump(stamp, f, indent=2)
+    return stamp
+
+
+def ensure_fixtures(root, profile='small'):
+    """Regresa las carpetas de documentos, generándolos solo si hace falta."""
+    try:
+        with open(os.path.join(root, STAMP_NAME)) as f:
+            stamp = json.load(f)
+    except (OSError, ValueError):
+        stamp = None
+    if stamp is None or stamp.get('profile') != profile or stamp.get('version') != FIXTURES_VERSION:
+        print(f"Generando documentos de prueba ({profile}) en {root}...")
+        generate(root, profile)
+    return {sub: os.path.join(root, sub) for sub in ('scanned', 'digital', 'cfdi')}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera documentos sintéticos para las mediciones.")
+    parser.add_argument('folder', help="carpeta donde se generan")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='small')
+    args = parser.parse_args(argv)
+    stamp = generate(args.folder, args.profile)
+    print(json.dumps(stamp, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,342 @@
+"""
+Mediciones de las herramientas de documentos (OCR, PDF, CFDI).
+
+Cada caso corre sobre los documentos sintéticos de
+bench_fixtures.py, en un proceso nuevo para que la memoria
+máxima (RSS) sea solo la suya, y registra:
+
+- segundos y rapidez (páginas/s o archivos/s)
+- memoria máxima del proceso y sus trabajadores
+- tamaño de lo que escribió
+
+Con --save-baseline se guarda la medición como referencia; las
+siguientes corridas se comparan contra ella y marcan como
+regresión lo que sea más lento, use más memoria o escriba
+archivos más grandes de lo tolerado (el código de salida es 1).
+La referencia solo tiene sentido en la misma máquina y perfil;
+el perfil small sirve para probar rápido, para detectar
+regresiones de rapidez conviene medium o large.
+
+Uso:
+    python benchmark.py [--profile small] [--only pdf_compress,cfdi_scan] [--repeat 3] [-j 1]
+    python benchmark.py --save-baseline
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from bench_fixtures import MY_NAME, PROFILES, ensure_fixtures
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+# Cuánto puede empeorar cada métrica antes de contarse como regresión
+TOLERANCES = {'rate': 0.15, 'peak_rss_mb': 0.20, 'output_bytes': 0.02}
+# Casos más cortos que esto son puro ruido: no se compara su rapidez
+MIN_COMPARABLE_SECONDS = 0.25
+
+Measurement = namedtuple('Measurement', ['seconds', 'items', 'output_bytes'])
+
+
+class Skipped(Exception):
+    """El caso no se puede correr aquí (falta una herramienta externa)."""
+
+
+def _folder_size(folder):
+    return sum(entry.stat().st_size for entry in os.scandir(folder) if entry.is_file())
+
+
+def _pdfs(folder):
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith('.pdf'))
+
+
+# -- casos -----------------------------------------------------------------
+# Cada uno recibe (documentos, carpeta de trabajo vacía, procesos) y regresa
+# un Measurement; lo que no se deba medir (copias, preparación) va fuera del reloj.
+
+def bench_ocr(fixtures, work, workers):
+    if not (shutil.which('tesseract') and shutil.which('pdftoppm')):
+        raise Skipped("hacen falta tesseract y poppler (pdftoppm)")
+    from ocr_engine import OcrEngine
+
+    from PyPDF2 import PdfReader
+
+    files = _pdfs(fixtures['scanned'])
+    pages = sum(len(PdfReader(path).pages) for path in files)
+    start = time.perf_counter()
+    with OcrEngine(workers=workers) as engine:
+        engine.process_files(files, work, use_index=False)
+    return Measurement(time.perf_counter() - start, pages, _folder_size(work))
+
+
+def _bench_compress(folder, work, workers):
+    from pdf_compress import compress_batch
+
+    start = time.perf_counter()
+    summary = compress_batch([folder], output_dir=work, workers=workers, force=True)
+    seconds = time.perf_counter() - start
+    if summary.errors:
+        raise RuntimeError(f"{len(summary.errors)} PDFs fallaron: {summary.errors[0]}")
+    return Measurement(seconds, sum(len(r.pages) for r in summary.results),
+                       sum(r.output_size for r in summary.results))
+
+
+def bench_pdf_compress_scanned(fixtures, work, workers):
+    return _bench_compress(fixtures['scanned'], work, workers)
+
+
+def bench_pdf_compress_digital(fixtures, work, workers):
+    return _bench_compress(fixtures['digital'], work, workers)
+
+
+def _all_pdfs(fixtures):
+    return [(path, None) for path in _pdfs(fixtures['digital']) + _pdfs(fixtures['scanned'])]
+
+
+def bench_stitch_streaming(fixtures, work, workers):
+    from pdf_stream_writer import merge_files
+
+    output = os.path.join(work, 'unido.pdf')
+    start = time.perf_counter()
+    pages = merge_files(_all_pdfs(fixtures), output)
+    return Measurement(time.perf_counter() - start, pages, os.path.getsize(output))
+
+
+def bench_stitch_memory(fixtures, work, workers):
+    from pdf_stitcher import ReaderCache, write_selections
+
+    output = os.path.join(work, 'unido.pdf')
+    start = time.perf_counter()
+    with ReaderCache() as readers:
+        pages = write_selections(_all_pdfs(fixtures), output, readers, streaming=False)
+    return Measurement(time.perf_counter() - start, pages, os.path.getsize(output))
+
+
+def bench_split(fixtures, work, workers):
+    from pdf_manifest import Planner, run_plans
+
+    manifest = [{'split': path, 'every': 1, 'output': os.path.join(work, '{stem}_{n:03d}.pdf')}
+                for path in _pdfs(fixtures['digital'])]
+    start = time.perf_counter()
+    plans = Planner().plan(manifest)
+    results = run_plans(plans, workers=workers)
+    seconds = time.perf_counter() - start
+    if any(r.error for r in results):
+        raise RuntimeError(next(r.error for r in results if r.error))
+    return Measurement(seconds, sum(r.pages for r in results), _folder_size(work))
+
+
+def bench_cfdi_scan(fixtures, work, workers):
+    from cfdi import scan_headers
+
+    start = time.perf_counter()
+    scanned = scan_headers(fixtures['cfdi'], workers=workers)
+    return Measurement(time.perf_counter() - start, len(scanned), 0)
+
+
+def bench_cfdi_scan_indexed(fixtures, work, workers):
+    from cfdi import scan_headers
+    from cfdi_index import CfdiIndex
+
+    index_path = os.path.join(work, 'index.sqlite')
+    with CfdiIndex(index_path) as index:
+        scan_headers(fixtures['cfdi'], workers=workers, index=index)  # primera corrida, sin medir
+    start = time.perf_counter()
+    with CfdiIndex(index_path) as index:
+        scanned = scan_headers(fixtures['cfdi'], workers=workers, index=index)
+    return Measurement(time.perf_counter() - start, len(scanned), os.path.getsize(index_path))
+
+
+def bench_cfdi_rename(fixtures, work, workers):
+    from cfdi import apply_plan, plan_renames, scan_headers
+
+    folder = os.path.join(work, 'cfdi')
+    shutil.copytree(fixtures['cfdi'], folder)
+    start = time.perf_counter()
+    plan = plan_renames(folder, scan_headers(folder, workers=workers), MY_NAME)
+    apply_plan(folder, plan, nombre_ignorado=MY_NAME)
+    return Measurement(time.perf_counter() - start, len(os.listdir(fixtures['cfdi'])), 0)
+
+
+CASES = {
+    'ocr': (bench_ocr, 'páginas'),
+    'pdf_compress_scanned': (bench_pdf_compress_scanned, 'páginas'),
+    'pdf_compress_digital': (bench_pdf_compress_digital, 'páginas'),
+    'stitch_streaming': (bench_stitch_streaming, 'páginas'),
+    'stitch_memory': (bench_stitch_memory, 'páginas'),
+    'split': (bench_split, 'páginas'),
+    'cfdi_scan': (bench_cfdi_scan, 'archivos'),
+    'cfdi_scan_indexed': (bench_cfdi_scan_indexed, 'archivos'),
+    'cfdi_rename': (bench_cfdi_rename, 'archivos'),
+}
+
+
+# -- ejecución -------------------------------------------------------------
+
+def _own_peak_kb():
+    # En Linux ru_maxrss sobrevive al exec: el proceso nuevo heredaría el máximo
+    # de quien lo lanzó. VmHWM sí empieza de cero.
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _peak_rss_mb():
+    """Memoria máxima de este proceso y de los trabajadores que ya terminaron, en MB."""
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    scale = 1024 if sys.platform == 'darwin' else 1
+    own = _own_peak_kb() or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return max(own, children) / 1024
+
+
+def _run_case(name, fixtures, workers):
+    function = CASES[name][0]
+    work = tempfile.mkdtemp(prefix=f'bench_{name}_')
+    try:
+        measurement = function(fixtures, work, workers)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return measurement, _peak_rss_mb()
+
+
+def run_case(name, fixtures, workers=1, repeat=1):
+    """Corre un caso `repeat` veces, cada una en un proceso nuevo; se queda con la más rápida."""
+    unit = CASES[name][1]
+    best = None
+    peak = None
+    context = multiprocessing.get_context('spawn')
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            measurement, rss = pool.submit(_run_case, name, fixtures, workers).result()
+        if best is None or measurement.seconds < best.seconds:
+            best = measurement
+        if rss is not None:
+            peak = max(peak or 0, rss)
+    return {
+        'unit': unit,
+        'seconds': round(best.seconds, 4),
+        'items': best.items,
+        'rate': round(best.items / best.seconds, 2) if best.seconds else None,
+        'peak_rss_mb': round(peak, 1) if peak is not None else None,
+        'output_bytes': best.output_bytes,
+    }
+
+
+def compare(results, baseline, tolerances=TOLERANCES):
+    """Regresa [(caso, métrica, antes, ahora)] de lo que empeoró más de lo tolerado."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get('cases', {}).get(name)
+        if not before:
+            continue
+        if before.get('rate') and result['rate'] is not None and before['seconds'] >= MIN_COMPARABLE_SECONDS:
+            if result['rate'] < before['rate'] * (1 - tolerances['rate']):
+                regressions.append((name, 'rate', before['rate'], result['rate']))
+        for metric in ('peak_rss_mb', 'output_bytes'):
+            if before.get(metric) and result[metric] is not None:
+                if result[metric] > before[metric] * (1 + tolerances[metric]):
+                    regressions.append((name, metric, before[metric], result[metric]))
+    return regressions
+
+
+def environment(profile, workers):
+    return {
+        'profile': profile,
+        'workers': workers,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'platform': platform.platform(),
+    }
+
+
+def _print_result(name, result, before=None):
+    rss = f"{result['peak_rss_mb']:.0f} MB" if result['peak_rss_mb'] is not None else "?"
+    line = (f"{name:24} {result['seconds']:8.2f} s  {result['rate']:10.1f} {result['unit']}/s  "
+            f"RSS {rss:>8}  salida {result['output_bytes'] / 1024 ** 2:8.2f} MB")
+    if before and before.get('rate'):
+        line += f"  ({100 * (result['rate'] / before['rate'] - 1):+.0f}% vs. referencia)"
+    print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide las herramientas de documentos y detecta regresiones.")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='small', help="tamaño de los documentos")
+    parser.add_argument('--fixtures', help="carpeta de los documentos sintéticos (por defecto, una temporal)")
+    parser.add_argument('--only', help=f"casos separados por comas: {', '.join(CASES)}")
+    parser.add_argument('--repeat', type=int, default=1, help="repeticiones por caso (se toma la más rápida)")
+    parser.add_argument('-j', '--workers', type=int, default=1, help="procesos que usa cada herramienta")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="archivo de referencia")
+    parser.add_argument('--save-baseline', action='store_true', help="guarda esta corrida como referencia")
+    parser.add_argument('-o', '--output', help="guarda también los resultados en este JSON")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(',') if args.only else list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"casos desconocidos: {', '.join(unknown)}")
+
+    fixtures_root = args.fixtures or os.path.join(tempfile.gettempdir(), f'curiosidades_bench_{args.profile}')
+    fixtures = ensure_fixtures(fixtures_root, args.profile)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        env = baseline.get('environment', {})
+        if (env.get('profile'), env.get('workers')) != (args.profile, args.workers):
+            print(f"La referencia es de otro perfil o número de procesos "
+                  f"({env.get('profile')}, -j {env.get('workers')}); no se compara.")
+            baseline = None
+
+    results = {}
+    for name in names:
+        try:
+            results[name] = run_case(name, fixtures, args.workers, args.repeat)
+        except Skipped as e:
+            print(f"{name:24} omitido: {e}")
+            continue
+        _print_result(name, results[name], (baseline or {}).get('cases', {}).get(name))
+
+    report = {'environment': environment(args.profile, args.workers), 'cases': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nReferencia guardada en {args.baseline}")
+        return 0
+
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline)
+    if not regressions:
+        print("\nSin regresiones contra la referencia.")
+        return 0
+    print("\nRegresiones:")
+    for name, metric, before, now in regressions:
+        print(f"  {name}: {metric} {before} -> {now}")
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
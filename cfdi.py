@@ -0,0 +1,634 @@
+"""
+Lectura rápida de facturas del SAT (CFDI).
+
+Para renombrar solo hacen falta los datos del encabezado
+(Comprobante, Emisor y Receptor), que vienen al principio del
+XML. En lugar de construir el árbol completo con ET.parse, aquí
+se lee el archivo en streaming con iterparse y se deja de leer
+en cuanto aparecen esos tres nodos, así que no importa qué tan
+grandes sean los Conceptos o el Complemento.
+
+Para carpetas grandes el renombrado va en dos fases: primero se
+leen todos los encabezados en paralelo (scan_headers) y luego se
+planean todos los nombres en un solo lugar (plan_renames), de
+forma determinista, antes de tocar cualquier archivo (apply_plan).
+
+El plan se guarda primero en una bitácora dentro de la carpeta y
+cada renombrado se anota al hacerse. Si el proceso se interrumpe,
+la bitácora permite terminar el lote (apply_journal) o deshacerlo
+(rollback_journal) sin volver a leer ningún XML. Una corrida sin
+nada que renombrar no toca la bitácora, y la de un lote terminado
+se conserva con la fecha en el nombre al empezar el siguiente.
+
+Uso:
+    python cfdi.py renombrar carpeta "NOMBRE A IGNORAR" [--dry-run] [-j 8]
+    python cfdi.py planear carpeta "NOMBRE A IGNORAR"
+    python cfdi.py aplicar carpeta
+    python cfdi.py revertir carpeta
+    python cfdi.py indexar carpeta
+    python cfdi.py consultar carpeta --emisor ACME --min-total 5000 --desde 2024-03 --hasta 2024-03
+    python cfdi.py reporte carpeta --nombre "MI NOMBRE" -o reporte.csv
+"""
+
+from collections import namedtuple
+from datetime import datetime
+import argparse
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from resource_limits import default_workers
+
+CfdiHeader = namedtuple(
+    'CfdiHeader',
+    ['path', 'total', 'emisor_nombre', 'receptor_nombre', 'emisor_rfc', 'receptor_rfc', 'fecha', 'uuid',
+     'moneda', 'tipo_cambio', 'tipo'],
+    defaults=[None] * 7,
+)
+
+# El timbre va en el Complemento, al final del archivo
+UUID_PATTERN = re.compile(rb'TimbreFiscalDigital\b[^>]*?\sUUID="([0-9A-Fa-f-]{36})"')
+TAIL_SIZE = 16 * 1024
+
+# Un renombrado planeado; kind es 'xml' o 'pdf'
+RenameOp = namedtuple('RenameOp', ['src', 'dst', 'kind'])
+
+# ops: renombrados a aplicar; skipped: (archivo, motivo); matched: facturas con el nombre ignorado
+RenamePlan = namedtuple('RenamePlan', ['ops', 'skipped', 'matched'])
+
+# Motivos para no renombrar una factura
+SKIP_ERROR = 'error'                    # el XML no se pudo leer
+SKIP_NOT_MATCHED = 'not_matched'        # el nombre ignorado no aparece
+SKIP_NO_NAME = 'no_name'                # no hay un nombre adecuado
+SKIP_ALREADY_NAMED = 'already_named'    # ya tiene el nombre que le toca
+NO_PDF = 'no_pdf'                       # se renombra el XML pero no hay PDF
+
+# Debajo de esto no vale la pena levantar procesos
+PARALLEL_THRESHOLD = 64
+
+
+def _local_name(tag):
+    # '{http://www.sat.gob.mx/cfd/4}Emisor' -> 'Emisor'
+    return tag.rpartition('}')[2]
+
+
+def read_uuid(f):
+    """Busca el UUID del TimbreFiscalDigital leyendo solo el final del archivo."""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(max(0, size - TAIL_SIZE))
+    match = UUID_PATTERN.search(f.read())
+    if match is None and size > TAIL_SIZE:
+        # Algún Addenda enorme después del timbre: se busca en todo el archivo,
+        # por pedazos y sin construir ningún árbol
+        f.seek(0)
+        carry = b''
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            match = UUID_PATTERN.search(carry + chunk)
+            if match:
+                break
+            carry = chunk[-512:]
+    return match.group(1).decode('ascii').upper() if match else None
+
+
+def read_header(xml_path):
+    """Extrae el encabezado (Comprobante, Emisor, Receptor) y el UUID sin leer el resto del XML."""
+    # Un XML que no es factura (un acuse, p. ej.) sale con todo en None
+    fields = dict.fromkeys(CfdiHeader._fields[1:])
+    seen = set()
+
+    with open(xml_path, 'rb') as f:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'end':
+                # Lo ya leído no se guarda en memoria
+                elem.clear()
+                continue
+
+            name = _local_name(elem.tag)
+
+            if name == 'Comprobante' and 'Comprobante' not in seen:
+                fields['total'] = elem.get('Total')
+                fields['fecha'] = elem.get('Fecha')
+                fields['moneda'] = elem.get('Moneda')
+                fields['tipo_cambio'] = elem.get('TipoCambio')
+                fields['tipo'] = elem.get('TipoDeComprobante')  # I, E, T, N o P
+                seen.add(name)
+            elif name == 'Emisor' and 'Emisor' not in seen:
+                fields['emisor_nombre'] = elem.get('Nombre')
+                fields['emisor_rfc'] = elem.get('Rfc')
+                seen.add(name)
+            elif name == 'Receptor' and 'Receptor' not in seen:
+                fields['receptor_nombre'] = elem.get('Nombre')
+                fields['receptor_rfc'] = elem.get('Rfc')
+                seen.add(name)
+
+            # Emisor y Receptor siempre van antes de los Conceptos
+            if len(seen) == 3 or name == 'Conceptos':
+                break
+
+        fields['uuid'] = read_uuid(f)
+
+    return CfdiHeader(xml_path, **fields)
+
+
+def is_invoice(header):
+    """False para XMLs sueltos sin Comprobante/Emisor/Receptor (acuses, etc.)."""
+    return any((header.total, header.emisor_nombre, header.receptor_nombre))
+
+
+def counterparty(header, nombre_ignorado):
+    """Regresa el nombre de la otra parte de la factura, o None."""
+    if header.emisor_nombre == nombre_ignorado:
+        return header.receptor_nombre
+    return header.emisor_nombre
+
+
+def short_name(nombre):
+    """Las primeras dos palabras del nombre, que es lo que va en el archivo."""
+    return ' '.join(nombre.split()[:2])
+
+
+def _read_header_safe(xml_path):
+    try:
+        return read_header(xml_path), None
+    except (ET.ParseError, OSError) as e:
+        return None, str(e)
+
+
+def scan_headers(folder_path, workers=None, index=None):
+    """Fase 1: lee el encabezado de cada XML de la carpeta, en paralelo.
+
+    Con un índice (cfdi_index.CfdiIndex) solo se leen los archivos nuevos
+    o modificados; el resto sale del índice sin abrir el XML.
+
+    Regresa una lista de (nombre de archivo, encabezado o None, error o None)
+    ordenada por nombre de archivo.
+    """
+    entries = sorted((e for e in os.scandir(folder_path) if e.name.endswith('.xml') and e.is_file()),
+                     key=lambda e: e.name)
+    workers = workers or default_workers()
+
+    results = {}
+    to_parse = []
+    if index is not None:
+        index.begin_scan(folder_path, [entry.path for entry in entries])
+    for entry in entries:
+        header = index.lookup(entry.path, entry.stat()) if index is not None else None
+        if header is not None:
+            results[entry.name] = (header, None)
+        else:
+            to_parse.append(entry)
+
+    paths = [entry.path for entry in to_parse]
+    if workers == 1 or len(paths) < PARALLEL_THRESHOLD:
+        parsed = list(map(_read_header_safe, paths))
+    else:
+        # Se importa aquí: multiprocessing pesa más que renombrar una carpeta chica
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Pedazos grandes para que el costo de mandar trabajos no domine
+        chunksize = max(1, len(paths) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(_read_header_safe, paths, chunksize=chunksize))
+
+    for entry, (header, error) in zip(to_parse, parsed):
+        results[entry.name] = (header, error)
+        if index is not None:
+            if header is not None:
+                index.store(header, entry.stat())
+            else:
+                index.discard(entry.path)
+    if index is not None:
+        # Lo que ya no está en la carpeta sale del índice
+        index.end_scan()
+        index.commit()
+
+    return [(entry.name,) + results[entry.name] for entry in entries]
+
+
+def target_stem(header, nombre_ignorado):
+    """El nombre (sin extensión) que le toca a la factura, o None."""
+    nombre = counterparty(header, nombre_ignorado)
+    if not nombre:
+        return None
+    return f"${header.total}_{short_name(nombre)}"
+
+
+def _has_stem(base_name, stem):
+    # Ya renombrado en una corrida anterior, con o sin sufijo numérico
+    if base_name == stem:
+        return True
+    prefix, _, suffix = base_name.rpartition('_')
+    return prefix == stem and suffix.isdigit()
+
+
+class NameAllocator:
+    """Reparte nombres únicos sin preguntarle al sistema de archivos.
+
+    El listado de la carpeta se lee una sola vez; después cada nombre se
+    resuelve en memoria. El contador por nombre base solo avanza, así que
+    cien facturas con el mismo total y la misma empresa cuestan O(1) cada
+    una en lugar de volver a probar _1, _2, ... con os.path.exists.
+    """
+
+    def __init__(self, existing_names, extensions=('.xml', '.pdf')):
+        self.extensions = extensions
+        self.taken = {os.path.normcase(name) for name in existing_names}
+        self.next_suffix = {}
+
+    @classmethod
+    def from_folder(cls, folder_path, **kwargs):
+        return cls(os.listdir(folder_path), **kwargs)
+
+    def __contains__(self, name):
+        return os.path.normcase(name) in self.taken
+
+    def allocate(self, stem):
+        """Regresa un nombre base libre para todas las extensiones a la vez.
+
+        El XML y su PDF comparten siempre el mismo sufijo (stem_3.xml y
+        stem_3.pdf), así que siguen emparejados después de renombrar.
+        """
+        count = self.next_suffix.get(stem, 0)
+        while True:
+            candidate = stem if count == 0 else f"{stem}_{count}"
+            names = [os.path.normcase(candidate + ext) for ext in self.extensions]
+            if not any(name in self.taken for name in names):
+                break
+            count += 1
+
+        self.next_suffix[stem] = count + 1
+        self.taken.update(names)
+        return candidate
+
+
+def plan_renames(folder_path, scanned, nombre_ignorado):
+    """Fase 2: decide todos los nombres nuevos sin tocar ningún archivo.
+
+    Las facturas se recorren en orden de nombre de archivo, así que el
+    resultado es el mismo sin importar en qué orden terminó la fase 1.
+    """
+    ops = []
+    skipped = []
+    matched = 0
+    names = NameAllocator.from_folder(folder_path)
+
+    for filename, header, error in scanned:
+        if header is None:
+            skipped.append((filename, SKIP_ERROR, error))
+            continue
+
+        if nombre_ignorado not in [header.emisor_nombre, header.receptor_nombre]:
+            skipped.append((filename, SKIP_NOT_MATCHED, None))
+            continue
+        matched += 1
+
+        stem = target_stem(header, nombre_ignorado)
+        if not stem:
+            skipped.append((filename, SKIP_NO_NAME, None))
+            continue
+
+        base_name = os.path.splitext(filename)[0]
+        if _has_stem(base_name, stem):
+            skipped.append((filename, SKIP_ALREADY_NAMED, None))
+            continue
+
+        new_stem = names.allocate(stem)
+        ops.append(RenameOp(filename, f"{new_stem}.xml", 'xml'))
+
+        pdf_name = f"{base_name}.pdf"
+        if pdf_name in names:
+            ops.append(RenameOp(pdf_name, f"{new_stem}.pdf", 'pdf'))
+        else:
+            skipped.append((filename, NO_PDF, None))
+
+    return RenamePlan(ops, skipped, matched)
+
+
+JOURNAL_NAME = '.cfdi_renombrado.journal'
+
+# Estado de una bitácora: ops planeadas, índices aplicados y si se revirtió
+JournalState = namedtuple('JournalState', ['meta', 'ops', 'done', 'rolled_back'])
+
+
+class PendingJournalError(Exception):
+    """Hay un lote a medias en la carpeta; hay que terminarlo o revertirlo."""
+
+
+def journal_path(folder_path):
+    return os.path.join(folder_path, JOURNAL_NAME)
+
+
+def read_journal(folder_path):
+    """Lee la bitácora de la carpeta, o regresa None si no hay."""
+    path = journal_path(folder_path)
+    if not os.path.exists(path):
+        return None
+
+    meta = {}
+    ops = []
+    done = set()
+    rolled_back = False
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Una línea cortada por un corte de luz; lo demás sigue valiendo
+                continue
+            if 'version' in entry:
+                meta = entry
+            elif 'src' in entry:
+                ops.append(RenameOp(entry['src'], entry['dst'], entry['kind']))
+            elif 'done' in entry:
+                done.add(entry['done'])
+            elif 'undone' in entry:
+                done.discard(entry['undone'])
+            elif entry.get('rolled_back'):
+                rolled_back = True
+    return JournalState(meta, ops, done, rolled_back)
+
+
+def is_pending(state):
+    return state is not None and not state.rolled_back and len(state.done) < len(state.ops)
+
+
+def rotate_journal(folder_path):
+    """Mueve la bitácora actual a .cfdi_renombrado.AAAAMMDD-HHMMSS.journal y regresa esa ruta."""
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    stem, ext = os.path.splitext(journal_path(folder_path))
+    rotated = f"{stem}.{stamp}{ext}"
+    count = 1
+    while os.path.exists(rotated):
+        rotated = f"{stem}.{stamp}_{count}{ext}"
+        count += 1
+    os.replace(journal_path(folder_path), rotated)
+    return rotated
+
+
+def write_journal(folder_path, plan, nombre_ignorado=None):
+    """Guarda el plan completo antes de tocar cualquier archivo.
+
+    La bitácora de un lote anterior ya terminado no se pierde: se
+    conserva con la fecha en el nombre (rotate_journal).
+    """
+    state = read_journal(folder_path)
+    if is_pending(state):
+        raise PendingJournalError(
+            f"Hay un renombrado a medias en {folder_path}; termínalo (aplicar) o deshazlo (revertir)."
+        )
+    if state is not None:
+        rotate_journal(folder_path)
+
+    tmp_path = journal_path(folder_path) + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        meta = {'version': 1, 'nombre_ignorado': nombre_ignorado,
+                'created': datetime.now().isoformat(timespec='seconds')}
+        f.write(json.dumps(meta, ensure_ascii=False) + '\n')
+        for op in plan.ops:
+            f.write(json.dumps(op._asdict(), ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, journal_path(folder_path))
+
+
+def _rename(folder_path, src, dst):
+    """Renombra src -> dst. Regresa False si ya estaba hecho (p. ej. tras un corte)."""
+    src_path = os.path.join(folder_path, src)
+    dst_path = os.path.join(folder_path, dst)
+    if os.path.exists(src_path) and not os.path.exists(dst_path):
+        os.rename(src_path, dst_path)
+        return True
+    if os.path.exists(dst_path) and not os.path.exists(src_path):
+        return False
+    raise FileExistsError(f"No se puede renombrar {src} -> {dst}: la carpeta cambió desde que se hizo el plan.")
+
+
+def apply_journal(folder_path, on_rename=None, index=None):
+    """Aplica (o termina de aplicar) los renombrados pendientes de la bitácora.
+
+    Con un índice (cfdi_index.CfdiIndex) se actualiza la ruta de cada XML renombrado.
+    """
+    state = read_journal(folder_path)
+    if state is None or state.rolled_back:
+        return 0
+
+    applied = 0
+    with open(journal_path(folder_path), 'a', encoding='utf-8') as journal:
+        for i, op in enumerate(state.ops):
+            if i in state.done:
+                continue
+            renamed = _rename(folder_path, op.src, op.dst)
+            journal.write(json.dumps({'done': i}) + '\n')
+            journal.flush()
+            if index is not None and op.kind == 'xml':
+                index.rename(os.path.join(folder_path, op.src), os.path.join(folder_path, op.dst))
+            if renamed:
+                applied += 1
+                if on_rename:
+                    on_rename(op)
+    if index is not None:
+        index.commit()
+    return applied
+
+
+def rollback_journal(folder_path, on_rename=None, index=None):
+    """Deshace, en orden inverso, todo lo que la bitácora tenga aplicado."""
+    state = read_journal(folder_path)
+    if state is None or state.rolled_back:
+        return 0
+
+    reverted = 0
+    with open(journal_path(folder_path), 'a', encoding='utf-8') as journal:
+        for i in range(len(state.ops) - 1, -1, -1):
+            op = state.ops[i]
+            dst_exists = os.path.exists(os.path.join(folder_path, op.dst))
+            src_exists = os.path.exists(os.path.join(folder_path, op.src))
+            # Si se cayó justo después de renombrar, el 'done' puede faltar
+            if i not in state.done and not (dst_exists and not src_exists):
+                continue
+            renamed = _rename(folder_path, op.dst, op.src)
+            journal.write(json.dumps({'undone': i}) + '\n')
+            journal.flush()
+            if index is not None and op.kind == 'xml':
+                index.rename(os.path.join(folder_path, op.dst), os.path.join(folder_path, op.src))
+            if renamed:
+                reverted += 1
+                if on_rename:
+                    on_rename(RenameOp(op.dst, op.src, op.kind))
+        journal.write(json.dumps({'rolled_back': True}) + '\n')
+    if index is not None:
+        index.commit()
+    return reverted
+
+
+def apply_plan(folder_path, plan, on_rename=None, nombre_ignorado=None, index=None):
+    """Fase 3: guarda el plan en la bitácora y aplica todos los renombrados."""
+    if not plan.ops:
+        # Nada que hacer: la bitácora del lote anterior se queda para poder revertirlo
+        return 0
+    write_journal(folder_path, plan, nombre_ignorado)
+    return apply_journal(folder_path, on_rename=on_rename, index=index)
+
+
+def _print_op(op):
+    print(f"{op.src} -> {op.dst}")
+
+
+def _print_plan(folder_path, plan):
+    for op in plan.ops:
+        _print_op(op)
+    for filename, reason, error in plan.skipped:
+        if reason == SKIP_ERROR:
+            print(f"No se pudo leer {filename}: {error}")
+    xml_count = sum(1 for op in plan.ops if op.kind == 'xml')
+    print(f"\n{xml_count} facturas por renombrar ({len(plan.ops)} archivos) en {folder_path}")
+
+
+def _open_index(args, folder_path, create=True):
+    if getattr(args, 'no_index', False):
+        return None
+    from cfdi_index import CfdiIndex, default_index_path
+    index_path = args.index or default_index_path(folder_path)
+    if not create and not os.path.exists(index_path):
+        return None
+    return CfdiIndex(index_path)
+
+
+def _print_headers(headers):
+    for h in headers:
+        print(f"{h.fecha or '?':19}  ${h.total or '?':>12}  {h.emisor_nombre or '?'} -> "
+              f"{h.receptor_nombre or '?'}  {h.uuid}  {os.path.basename(h.path)}")
+    print(f"\n{len(headers)} facturas.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Renombra facturas del SAT (XML + PDF) por total y contraparte.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_index_args(p):
+        p.add_argument('--index', help="ruta al índice de facturas (por defecto, .cfdi_index.sqlite en la carpeta)")
+        p.add_argument('--no-index', action='store_true', help="no usar el índice; leer todos los XML")
+
+    for name, help_text in [('renombrar', "planea y aplica los renombrados"),
+                            ('planear', "solo guarda el plan en la bitácora, sin renombrar")]:
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument('folder')
+        p.add_argument('nombre_ignorado', help="tu propio nombre, tal como aparece en las facturas")
+        p.add_argument('-j', '--workers', type=int, default=None, help="procesos para leer los XML")
+        add_index_args(p)
+        if name == 'renombrar':
+            p.add_argument('-n', '--dry-run', action='store_true', help="solo muestra qué se haría")
+
+    for name, help_text in [('aplicar', "aplica o termina un lote de la bitácora"),
+                            ('revertir', "deshace el último lote de la bitácora")]:
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument('folder')
+        add_index_args(p)
+
+    p = sub.add_parser('indexar', help="lee los XML nuevos o modificados y los guarda en el índice")
+    p.add_argument('folder')
+    p.add_argument('-j', '--workers', type=int, default=None)
+    p.add_argument('--index')
+
+    p = sub.add_parser('consultar', help="busca facturas en el índice sin abrir los XML")
+    p.add_argument('folder')
+    p.add_argument('--index')
+    p.add_argument('--emisor', help="parte del nombre del emisor")
+    p.add_argument('--receptor', help="parte del nombre del receptor")
+    p.add_argument('--rfc', help="RFC del emisor o del receptor")
+    p.add_argument('--min-total', type=float)
+    p.add_argument('--max-total', type=float)
+    p.add_argument('--desde', help="fecha inicial: AAAA, AAAA-MM o AAAA-MM-DD")
+    p.add_argument('--hasta', help="fecha final (inclusive): AAAA, AAAA-MM o AAAA-MM-DD")
+
+    p = sub.add_parser('reporte', help="totales por contraparte y mes, exportados a CSV o Parquet")
+    p.add_argument('folder')
+    p.add_argument('--nombre', help="tu propio nombre: la contraparte es la otra parte de cada factura")
+    p.add_argument('-o', '--output', help="archivo .csv o .parquet (por defecto, se imprime)")
+    p.add_argument('--sin-mes', action='store_true', help="agrupar solo por contraparte")
+    p.add_argument('-j', '--workers', type=int, default=None)
+    add_index_args(p)
+
+    args = parser.parse_args(argv)
+    folder_path = os.path.normpath(args.folder.strip('"').strip("'"))
+    if not os.path.isdir(folder_path):
+        print(f"Error: La ruta especificada '{folder_path}' no existe.")
+        return 1
+
+    try:
+        if args.command in ('renombrar', 'planear'):
+            index = _open_index(args, folder_path)
+            try:
+                scanned = scan_headers(folder_path, args.workers, index=index)
+                plan = plan_renames(folder_path, scanned, args.nombre_ignorado)
+                if not plan.matched:
+                    print(f"Error: El nombre '{args.nombre_ignorado}' no se encontró en los archivos XML.")
+                    return 1
+                if args.command == 'planear' or args.dry_run:
+                    _print_plan(folder_path, plan)
+                    if args.command == 'planear' and plan.ops:
+                        write_journal(folder_path, plan, args.nombre_ignorado)
+                        print(f"Plan guardado en {journal_path(folder_path)}; aplícalo con: python cfdi.py aplicar")
+                    return 0
+                count = apply_plan(folder_path, plan, on_rename=_print_op, nombre_ignorado=args.nombre_ignorado,
+                                   index=index)
+            finally:
+                if index is not None:
+                    index.close()
+            print(f"\n{count} archivos renombrados.")
+        elif args.command in ('aplicar', 'revertir'):
+            # El índice solo se actualiza si ya existe; no se crea uno para esto
+            index = _open_index(args, folder_path, create=False)
+            try:
+                if args.command == 'aplicar':
+                    count = apply_journal(folder_path, on_rename=_print_op, index=index)
+                    print(f"\n{count} archivos renombrados.")
+                else:
+                    count = rollback_journal(folder_path, on_rename=_print_op, index=index)
+                    print(f"\n{count} archivos regresados a su nombre original.")
+            finally:
+                if index is not None:
+                    index.close()
+        elif args.command == 'indexar':
+            with _open_index(args, folder_path) as index:
+                scanned = scan_headers(folder_path, args.workers, index=index)
+            errors = [(filename, error) for filename, header, error in scanned if header is None]
+            for filename, error in errors:
+                print(f"No se pudo leer {filename}: {error}")
+            invoices = sum(1 for filename, header, error in scanned if header is not None and is_invoice(header))
+            print(f"{invoices} facturas en el índice de {folder_path}.")
+        elif args.command == 'consultar':
+            with _open_index(args, folder_path) as index:
+                headers = index.query(emisor=args.emisor, receptor=args.receptor, rfc=args.rfc,
+                                      min_total=args.min_total, max_total=args.max_total,
+                                      desde=args.desde, hasta=args.hasta,
+                                      folder=folder_path if args.index else None)
+            _print_headers(headers)
+        elif args.command == 'reporte':
+            from cfdi_report import build_report, export_report
+            index = _open_index(args, folder_path)
+            try:
+                scanned = scan_headers(folder_path, args.workers, index=index)
+            finally:
+                if index is not None:
+                    index.close()
+            headers = [header for filename, header, error in scanned if header is not None and is_invoice(header)]
+            report = build_report(headers, nombre_propio=args.nombre, by_month=not args.sin_mes)
+            if args.output:
+                export_report(report, args.output)
+                print(f"Reporte de {len(headers)} facturas ({len(report)} renglones) guardado en {args.output}")
+            else:
+                print(report.to_string(index=False))
+    except (PendingJournalError, FileExistsError) as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
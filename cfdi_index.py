@@ -0,0 +1,220 @@
+"""
+Índice local (SQLite) de las facturas ya leídas.
+
+Cada archivo de factura se guarda por su ruta, con el UUID
+(TimbreFiscalDigital), emisor, receptor, RFCs, total, fecha y la
+fecha de modificación del archivo; dos copias de la misma factura
+son dos renglones. Así, al volver a correr los
+renombradores solo se leen los XML nuevos o modificados, y se
+pueden hacer consultas sin abrir ningún XML. Al aplicar o revertir
+un lote, la ruta de cada factura renombrada se actualiza en el acto:
+
+    python cfdi.py consultar carpeta --emisor ACME --min-total 5000 --desde 2024-03 --hasta 2024-03
+"""
+
+import os
+import sqlite3
+
+from cfdi import CfdiHeader, read_uuid
+
+DEFAULT_INDEX_NAME = '.cfdi_index.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    path TEXT PRIMARY KEY,
+    uuid TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    total TEXT,
+    total_value REAL,
+    fecha TEXT,
+    emisor_nombre TEXT,
+    emisor_rfc TEXT,
+    receptor_nombre TEXT,
+    receptor_rfc TEXT,
+    moneda TEXT,
+    tipo_cambio TEXT,
+    tipo TEXT
+);
+CREATE INDEX IF NOT EXISTS invoices_uuid ON invoices (uuid);
+CREATE INDEX IF NOT EXISTS invoices_emisor_rfc ON invoices (emisor_rfc);
+CREATE INDEX IF NOT EXISTS invoices_receptor_rfc ON invoices (receptor_rfc);
+CREATE INDEX IF NOT EXISTS invoices_fecha ON invoices (fecha);
+"""
+
+# Versión 2: una fila por ruta (antes, por UUID); 3: moneda y tipo. El índice
+# es un caché, así que uno viejo simplemente se tira y se vuelve a llenar
+SCHEMA_VERSION = 3
+
+_HEADER_COLUMNS = ("uuid, total, fecha, emisor_nombre, emisor_rfc, receptor_nombre, receptor_rfc, "
+                   "moneda, tipo_cambio, tipo")
+
+
+def default_index_path(folder_path):
+    return os.path.join(folder_path, DEFAULT_INDEX_NAME)
+
+
+def _to_float(total):
+    try:
+        return float(total)
+    except (TypeError, ValueError):
+        return None
+
+
+class CfdiIndex:
+    """Metadatos de facturas por UUID, con la ruta y mtime para saber qué cambió."""
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.conn = sqlite3.connect(index_path)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS invoices")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.executescript(SCHEMA)
+        self._orphans = {}  # uuid -> [rutas]: filas de la carpeta cuyos archivos ya no están
+
+    def _header(self, path, row):
+        (uuid, total, fecha, emisor_nombre, emisor_rfc, receptor_nombre, receptor_rfc,
+         moneda, tipo_cambio, tipo) = row
+        return CfdiHeader(path, total, emisor_nombre, receptor_nombre, emisor_rfc, receptor_rfc, fecha, uuid,
+                          moneda, tipo_cambio, tipo)
+
+    def _rows_in(self, folder_path):
+        """Las rutas guardadas de archivos que están directamente en la carpeta."""
+        folder_path = os.path.abspath(folder_path)
+        prefix = os.path.join(folder_path, '')
+        rows = self.conn.execute(
+            "SELECT path, uuid FROM invoices WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+        ).fetchall()
+        return [(path, uuid) for path, uuid in rows if os.path.dirname(path) == folder_path]
+
+    def begin_scan(self, folder_path, paths):
+        """Antes de revisar una carpeta: anota qué filas apuntan a archivos que ya no están.
+
+        Solo si hay de esas vale la pena buscar renombrados por UUID en lookup.
+        """
+        present = {os.path.abspath(path) for path in paths}
+        self._orphans = {}
+        for path, uuid in self._rows_in(folder_path):
+            if path not in present:
+                self._orphans.setdefault(uuid, []).append(path)
+
+    def end_scan(self):
+        """Borra las filas de archivos que desaparecieron (y no se encontraron renombrados)."""
+        self.conn.executemany("DELETE FROM invoices WHERE path = ?",
+                              [(path,) for paths in self._orphans.values() for path in paths])
+        self._orphans = {}
+
+    def lookup(self, path, stat):
+        """Regresa el encabezado guardado si el archivo no ha cambiado, o None."""
+        path = os.path.abspath(path)
+        row = self.conn.execute(
+            f"SELECT mtime_ns, size, {_HEADER_COLUMNS} FROM invoices WHERE path = ?", (path,)
+        ).fetchone()
+        if row is not None:
+            if row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+                return self._header(path, row[2:])
+            return None
+        if not self._orphans:
+            return None
+
+        # Ruta desconocida y hay filas sin archivo: puede ser una factura que solo
+        # se renombró. Leer el UUID del final es más barato que el encabezado.
+        try:
+            with open(path, 'rb') as f:
+                uuid = read_uuid(f)
+        except OSError:
+            return None
+        for old_path in self._orphans.get(uuid, ()):
+            row = self.conn.execute(
+                f"SELECT mtime_ns, size, {_HEADER_COLUMNS} FROM invoices WHERE path = ?", (old_path,)
+            ).fetchone()
+            if row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+                self._orphans[uuid].remove(old_path)
+                self.conn.execute("UPDATE invoices SET path = ? WHERE path = ?", (path, old_path))
+                return self._header(path, row[2:])
+        return None
+
+    def discard(self, path):
+        """Olvida lo guardado para una ruta (el archivo ya no es una factura legible)."""
+        self.conn.execute("DELETE FROM invoices WHERE path = ?", (os.path.abspath(path),))
+
+    def store(self, header, stat):
+        """Guarda (o reemplaza) lo de una ruta. Las facturas sin timbre no se guardan."""
+        if not header.uuid:
+            self.discard(header.path)
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO invoices (path, uuid, mtime_ns, size, total, total_value, fecha, "
+            "emisor_nombre, emisor_rfc, receptor_nombre, receptor_rfc, moneda, tipo_cambio, tipo) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (os.path.abspath(header.path), header.uuid, stat.st_mtime_ns, stat.st_size,
+             header.total, _to_float(header.total), header.fecha,
+             header.emisor_nombre, header.emisor_rfc, header.receptor_nombre, header.receptor_rfc,
+             header.moneda, header.tipo_cambio, header.tipo),
+        )
+
+    def rename(self, old_path, new_path):
+        """Anota la ruta nueva de un archivo renombrado.
+
+        Renombrar no cambia mtime ni tamaño, así que el resto del registro sigue valiendo.
+        """
+        new_path = os.path.abspath(new_path)
+        self.conn.execute("DELETE FROM invoices WHERE path = ?", (new_path,))
+        self.conn.execute("UPDATE invoices SET path = ? WHERE path = ?", (new_path, os.path.abspath(old_path)))
+
+    def commit(self):
+        self.conn.commit()
+
+    def query(self, emisor=None, receptor=None, rfc=None, min_total=None, max_total=None,
+              desde=None, hasta=None, folder=None):
+        """Busca facturas en el índice.
+
+        emisor/receptor buscan por parte del nombre (sin importar mayúsculas),
+        rfc por el de cualquiera de las dos partes, y desde/hasta aceptan
+        'AAAA', 'AAAA-MM' o 'AAAA-MM-DD' (ambos inclusive).
+        """
+        clauses = []
+        params = []
+        if emisor:
+            clauses.append("emisor_nombre LIKE ?")
+            params.append(f"%{emisor}%")
+        if receptor:
+            clauses.append("receptor_nombre LIKE ?")
+            params.append(f"%{receptor}%")
+        if rfc:
+            clauses.append("(emisor_rfc = ? OR receptor_rfc = ?)")
+            params += [rfc.upper(), rfc.upper()]
+        if min_total is not None:
+            clauses.append("total_value >= ?")
+            params.append(min_total)
+        if max_total is not None:
+            clauses.append("total_value <= ?")
+            params.append(max_total)
+        if desde:
+            clauses.append("fecha >= ?")
+            params.append(desde)
+        if hasta:
+            # '2024-03' debe incluir todo marzo: todo lo que empiece con el prefijo
+            clauses.append("fecha < ?")
+            params.append(hasta + '\uffff')
+        if folder:
+            prefix = os.path.join(os.path.abspath(folder), '')
+            clauses.append("substr(path, 1, ?) = ?")
+            params += [len(prefix), prefix]
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(
+            f"SELECT path, {_HEADER_COLUMNS} FROM invoices {where} ORDER BY fecha, uuid", params
+        ).fetchall()
+        return [self._header(row[0], row[1:]) for row in rows]
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,107 @@
+"""
+Reportes de facturas del SAT a partir de los encabezados.
+
+Usa los mismos encabezados que ya extraen los renombradores
+(y el índice), así que no hace falta armar la hoja de cálculo
+a mano: totales, número de facturas y rango de fechas por
+contraparte y por mes, todo con operaciones de pandas sobre
+columnas completas (nada de ciclos por factura).
+
+Los totales no mezclan monedas: cada moneda va en su propio
+renglón (total_mxn los convierte con el TipoCambio de cada
+factura, si lo trae). Las notas de crédito (tipo E) restan, y los
+complementos de pago (P) y traslados (T) no son importes, así que
+no se cuentan.
+
+    python cfdi.py reporte carpeta --nombre "MI NOMBRE" -o reporte.csv
+"""
+
+import numpy as np
+import pandas as pd
+
+from cfdi import CfdiHeader
+
+EMITIDA = 'emitida'
+RECIBIDA = 'recibida'
+
+EGRESO = 'E'                 # nota de crédito: resta
+SIN_IMPORTE = ('P', 'T')     # pagos y traslados: su Total no es una venta ni una compra
+DEFAULT_CURRENCY = 'MXN'     # CFDI viejos podían omitir Moneda
+
+
+def headers_to_frame(headers):
+    """Convierte una lista de CfdiHeader en un DataFrame con tipos útiles."""
+    df = pd.DataFrame.from_records(headers, columns=CfdiHeader._fields)
+    df['total'] = pd.to_numeric(df['total'], errors='coerce')
+    df['tipo_cambio'] = pd.to_numeric(df['tipo_cambio'], errors='coerce')
+    df['moneda'] = df['moneda'].fillna(DEFAULT_CURRENCY).str.upper()
+    df['tipo'] = df['tipo'].fillna('I').str.upper()
+    df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce', format='ISO8601')
+    df['mes'] = df['fecha'].dt.to_period('M').astype(str).replace('NaT', '')
+    return df
+
+
+def add_counterparty(df, nombre_propio=None):
+    """Agrega las columnas contraparte, contraparte_rfc y direccion.
+
+    Con nombre_propio, la contraparte es quien no seas tú y la dirección
+    dice si la factura la emitiste o la recibiste. Sin él, la contraparte
+    es el emisor.
+    """
+    if nombre_propio:
+        emitida = (df['emisor_nombre'] == nombre_propio).to_numpy()
+        df['contraparte'] = np.where(emitida, df['receptor_nombre'], df['emisor_nombre'])
+        df['contraparte_rfc'] = np.where(emitida, df['receptor_rfc'], df['emisor_rfc'])
+        df['direccion'] = np.where(emitida, EMITIDA, RECIBIDA)
+    else:
+        df['contraparte'] = df['emisor_nombre']
+        df['contraparte_rfc'] = df['emisor_rfc']
+        df['direccion'] = RECIBIDA
+    df['contraparte'] = df['contraparte'].fillna('(sin nombre)')
+    df['contraparte_rfc'] = df['contraparte_rfc'].fillna('')
+    return df
+
+
+def build_report(headers, nombre_propio=None, by_month=True):
+    """Totales, número de facturas y rango de fechas por contraparte, moneda (y mes)."""
+    df = add_counterparty(headers_to_frame(headers), nombre_propio)
+    df = df[~df['tipo'].isin(SIN_IMPORTE)].copy()
+    egreso = df['tipo'] == EGRESO
+    df['importe'] = df['total'].where(~egreso, -df['total'])
+    df['nota_credito'] = egreso
+    rate = df['tipo_cambio'].where(df['moneda'] != DEFAULT_CURRENCY, 1.0)
+    df['importe_mxn'] = df['importe'] * rate
+    df['sin_tipo_cambio'] = df['importe_mxn'].isna() & df['importe'].notna()
+
+    keys = ['contraparte', 'contraparte_rfc', 'direccion', 'moneda']
+    if by_month:
+        keys.append('mes')
+
+    report = (
+        df.groupby(keys, sort=True, dropna=False)
+        .agg(
+            facturas=('path', 'size'),
+            notas_credito=('nota_credito', 'sum'),
+            total=('importe', 'sum'),
+            promedio=('importe', 'mean'),
+            total_mxn=('importe_mxn', 'sum'),
+            sin_tipo_cambio=('sin_tipo_cambio', 'sum'),
+            primera=('fecha', 'min'),
+            ultima=('fecha', 'max'),
+        )
+        .reset_index()
+    )
+    # Si a alguna factura en otra moneda le falta el tipo de cambio, la conversión queda vacía
+    report['total_mxn'] = report['total_mxn'].where(report.pop('sin_tipo_cambio') == 0)
+    for column in ('total', 'promedio', 'total_mxn'):
+        report[column] = report[column].round(2)
+    return report
+
+
+def export_report(report, output_path):
+    """Guarda el reporte como CSV o Parquet, según la extensión."""
+    if output_path.lower().endswith('.parquet'):
+        # Requiere pyarrow o fastparquet
+        report.to_parquet(output_path, index=False)
+    else:
+        report.to_csv(output_path, index=False, encoding='utf-8-sig')  # utf-8-sig para que Excel vea los acentos
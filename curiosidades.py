@@ -0,0 +1,71 @@
+"""
+Una sola entrada para todas las herramientas.
+
+Cada comando es el main() de uno de los módulos y el módulo se
+importa hasta que se usa el comando: `curiosidades cfdi ...` no
+carga pandas, PyPDF2 ni selenium, así que arranca en unas decenas
+de milisegundos. Los módulos no hacen nada al importarse, así que
+también se pueden usar desde otros programas:
+
+    from pdf_compress import compress_pdf
+    from cfdi import scan_headers, plan_renames, apply_plan
+
+Uso:
+    curiosidades <comando> [argumentos del comando]
+    curiosidades cfdi renombrar carpeta "MI NOMBRE"
+    curiosidades comprimir carpeta -d comprimidos -j 4
+    curiosidades <comando> --help
+
+Sin instalar (pip install -e .): python curiosidades.py <comando> ...
+"""
+
+import argparse
+import importlib
+import importlib.util
+import sys
+
+# comando -> (módulo con main(argv), descripción)
+COMMANDS = {
+    'cfdi': ('cfdi', "renombra, indexa y reporta facturas del SAT"),
+    'ocr': ('ocr_engine', "pasa PDFs escaneados a texto"),
+    'buscar': ('ocr_index', "busca texto en las transcripciones OCR"),
+    'comprimir': ('pdf_compress', "comprime PDFs (imágenes, metadatos y objetos repetidos)"),
+    'coser': ('pdf_stitcher', "une o recorta PDFs"),
+    'manifiesto': ('pdf_manifest', "une y parte PDFs según un manifiesto"),
+    'descargar': ('Descargador', "envía archivos .smi al sitio y descarga los resultados"),
+    'musica': ('Trend_analyzer', "analiza el historial de escucha exportado en CSV"),
+}
+
+# Herramientas de desarrollo: no se instalan con pip, así que solo aparecen
+# cuando se corre desde el repositorio
+DEV_COMMANDS = {
+    'sitio-prueba': ('mock_swisstarget', "imitación local del sitio, para probar descargar"),
+    'medir': ('benchmark', "mide las herramientas y compara contra la referencia"),
+    'fixtures': ('bench_fixtures', "genera documentos sintéticos para medir"),
+}
+COMMANDS.update((name, command) for name, command in DEV_COMMANDS.items()
+                if importlib.util.find_spec(command[0]) is not None)
+
+
+def build_parser():
+    commands = '\n'.join(f"  {name:<14}{help}" for name, (_, help) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog='curiosidades', description="Herramientas para facturas, PDFs, OCR y descargas.",
+        epilog=f"comandos:\n{commands}\n\nAyuda de cada comando: curiosidades <comando> --help",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', metavar='comando', choices=COMMANDS)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Solo el primer argumento es nuestro; el resto es del comando
+    args = build_parser().parse_args(argv[:1])
+    module = importlib.import_module(COMMANDS[args.command][0])
+    # Para que la ayuda del comando diga 'curiosidades cfdi' y no 'curiosidades.py'
+    sys.argv[0] = f"curiosidades {args.command}"
+    return module.main(argv[1:])
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
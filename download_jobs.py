@@ -0,0 +1,161 @@
+"""
+Cola persistente de trabajos para Descargador.py.
+
+Guarda en SQLite el estado de cada archivo .smi (pendiente,
+enviado, descargado o fallido), así que si el programa se
+interrumpe, al volver a correrlo solo se procesan los que
+faltan. Los fallos se reintentan con espera exponencial y
+RateLimiter evita saturar al sitio.
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_NAME = '.descargas.sqlite'
+
+PENDING = 'pending'
+SUBMITTED = 'submitted'
+DOWNLOADED = 'downloaded'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    output TEXT,
+    last_error TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, next_attempt);
+"""
+
+
+class RateLimiter:
+    """Deja pasar como máximo `per_minute` envíos por minuto, repartidos entre todos los hilos."""
+
+    def __init__(self, per_minute=None):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class JobQueue:
+    """Estado de cada archivo, compartido entre los hilos de descarga."""
+
+    def __init__(self, db_path, max_attempts=5, backoff=10.0, max_backoff=600.0):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    def sync(self, files, retry_failed=False):
+        """Agrega los archivos nuevos y regresa a pendiente lo que quedó a medias.
+
+        Un 'submitted' significa que el programa se cayó a mitad del envío;
+        un 'downloaded' cuyo archivo ya no existe se vuelve a descargar.
+        """
+        now = time.time()
+        with self.lock, self.conn:
+            for path in files:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO jobs (name, path, state, updated) VALUES (?, ?, ?, ?)",
+                    (os.path.basename(path), os.path.abspath(path), PENDING, now),
+                )
+            self.conn.execute("UPDATE jobs SET state = ?, next_attempt = 0 WHERE state = ?", (PENDING, SUBMITTED))
+            for name, output in self.conn.execute(
+                    "SELECT name, output FROM jobs WHERE state = ?", (DOWNLOADED,)).fetchall():
+                if not output or not os.path.exists(output):
+                    self.conn.execute("UPDATE jobs SET state = ?, next_attempt = 0 WHERE name = ?", (PENDING, name))
+            if retry_failed:
+                self.conn.execute("UPDATE jobs SET state = ?, attempts = 0, next_attempt = 0 WHERE state = ?",
+                                  (PENDING, FAILED))
+
+    def claim(self):
+        """Toma el siguiente archivo listo para enviarse; regresa (nombre, ruta) o None."""
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT name, path FROM jobs WHERE state = ? AND next_attempt <= ? ORDER BY name LIMIT 1",
+                (PENDING, time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, updated = ? WHERE name = ?",
+                (SUBMITTED, time.time(), row[0]),
+            )
+            return row
+
+    def release(self, name):
+        """Regresa a la cola un archivo tomado que al final no se envió (no cuenta como intento)."""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = MAX(attempts - 1, 0), updated = ? WHERE name = ?",
+                (PENDING, time.time(), name),
+            )
+
+    def next_ready_in(self):
+        """Segundos hasta que haya trabajo, o None si ya no queda nada por hacer."""
+        with self.lock:
+            pending = self.conn.execute(
+                "SELECT MIN(next_attempt) FROM jobs WHERE state = ?", (PENDING,)).fetchone()[0]
+            in_flight = self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = ?", (SUBMITTED,)).fetchone()[0]
+        if pending is not None:
+            return max(0.0, pending - time.time())
+        if in_flight:
+            # Otro hilo todavía puede fallar y regresar su archivo a la cola
+            return 1.0
+        return None
+
+    def mark_downloaded(self, name, output):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, output = ?, last_error = NULL, updated = ? WHERE name = ?",
+                (DOWNLOADED, output, time.time(), name),
+            )
+
+    def mark_failed(self, name, error):
+        """Programa un reintento con espera exponencial, o lo da por fallido."""
+        with self.lock, self.conn:
+            attempts = self.conn.execute("SELECT attempts FROM jobs WHERE name = ?", (name,)).fetchone()[0]
+            if attempts >= self.max_attempts:
+                state, next_attempt = FAILED, 0
+            else:
+                delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+                state, next_attempt = PENDING, time.time() + delay * random.uniform(0.8, 1.2)
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, next_attempt = ?, last_error = ?, updated = ? WHERE name = ?",
+                (state, next_attempt, str(error), time.time(), name),
+            )
+            return state
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    def failures(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT name, attempts, last_error FROM jobs WHERE state = ? ORDER BY name", (FAILED,)).fetchall()
+
+    def close(self):
+        self.conn.close()
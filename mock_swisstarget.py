@@ -0,0 +1,133 @@
+"""
+Servidor local que imita al sitio de predicción para probar
+Descargador.py sin mandarle nada al sitio real.
+
+Tiene los mismos elementos que busca el descargador (smilesBox,
+submitButton y el botón buttons-csv) y puede fallar o tardar a
+propósito para probar los reintentos:
+
+    python mock_swisstarget.py --port 8765 --fail-rate 0.3 --delay 0.5
+    python Descargador.py carpeta_smi --url http://127.0.0.1:8765/
+"""
+
+import argparse
+import html
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FORM_PAGE = """<!doctype html>
+<html><body>
+<form method="post" action="/predict">
+  <textarea id="smilesBox" name="smiles" rows="10" cols="80"></textarea>
+  <button id="submitButton" type="submit">Submit</button>
+</form>
+</body></html>"""
+
+RESULT_PAGE = """<!doctype html>
+<html><body>
+<p>Resultados para {count} molécula(s)</p>
+<a class="buttons-csv" href="/csv?id={job_id}">CSV</a>
+</body></html>"""
+
+
+class MockState:
+    def __init__(self, fail_rate=0.0, delay=0.0):
+        self.fail_rate = fail_rate
+        self.delay = delay
+        self.results = {}
+        self.submissions = 0
+        self.lock = threading.Lock()
+
+
+def make_csv(smiles_lines):
+    """Unas cuantas filas falsas por molécula; la columna Query dice de cuál salió."""
+    rng = random.Random(' '.join(smiles_lines))
+    rows = ["Query,Target,Common name,Probability"]
+    for query in smiles_lines:
+        for n in range(rng.randint(1, 4)):
+            rows.append(f'"{query}",Target {n},T{n},{rng.random():.3f}')
+    return '\n'.join(rows) + '\n'
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/':
+                self._send(200, FORM_PAGE)
+            elif url.path == '/csv':
+                job_id = parse_qs(url.query).get('id', [''])[0]
+                with state.lock:
+                    csv = state.results.pop(job_id, None)
+                if csv is None:
+                    self._send(404, 'no existe')
+                    return
+                self._send(200, csv, 'text/csv; charset=utf-8',
+                           {'Content-Disposition': 'attachment; filename="SwissTargetPrediction.csv"'})
+            else:
+                self._send(404, 'no existe')
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            form = parse_qs(self.rfile.read(length).decode('utf-8'))
+            smiles = [line.strip() for line in form.get('smiles', [''])[0].splitlines() if line.strip()]
+
+            with state.lock:
+                state.submissions += 1
+            time.sleep(state.delay)
+            if not smiles or random.random() < state.fail_rate:
+                self._send(500, '<html><body>Error interno</body></html>')
+                return
+
+            job_id = uuid.uuid4().hex
+            with state.lock:
+                state.results[job_id] = make_csv(smiles)
+            self._send(200, RESULT_PAGE.format(count=len(smiles), job_id=html.escape(job_id)))
+
+    return Handler
+
+
+def serve(port=8765, fail_rate=0.0, delay=0.0):
+    """Arranca el servidor en un hilo; regresa (servidor, estado). server.shutdown() lo detiene."""
+    state = MockState(fail_rate, delay)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Imitación local del sitio de predicción.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="fracción de envíos que fallan (0-1)")
+    parser.add_argument('--delay', type=float, default=0.0, help="segundos que tarda cada envío")
+    args = parser.parse_args(argv)
+
+    server, state = serve(args.port, args.fail_rate, args.delay)
+    print(f"Sirviendo en http://127.0.0.1:{args.port}/ (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"\n{state.submissions} envíos recibidos.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+Motor de OCR para pasar PDFs escaneados a texto.
+
+Junta lo que antes estaba repetido en File_digitizer.py y
+file_digitizer_v2.py. El rasterizador (PDF -> imagen) y el
+backend de OCR (imagen -> texto) se pueden cambiar, y todos
+los modos de rendimiento viven aquí:
+
+- streaming: rasteriza una página a la vez en lugar del PDF completo
+- paralelo: reparte las páginas entre varios procesos
+- caché: no vuelve a hacer OCR de páginas que ya se procesaron
+
+Uso:
+    python ocr_engine.py carpeta_o_pdfs... [-o salida] [-j 4] [--memory-per-worker 1500]
+    python ocr_engine.py carpeta1 carpeta2 --index archivo.sqlite   # un índice para todo el archivo
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from ocr_index import OcrIndex, DEFAULT_INDEX_NAME
+from resource_limits import default_workers, init_worker
+
+
+class Pdf2ImageRasterizer:
+    """Convierte páginas de PDF a imágenes con poppler (pdf2image)."""
+
+    def __init__(self, dpi=300, poppler_path=None):
+        self.dpi = dpi
+        self.poppler_path = poppler_path
+
+    @property
+    def cache_tag(self):
+        return f"pdf2image-{self.dpi}"
+
+    def page_count(self, pdf_path):
+        from pdf2image import pdfinfo_from_path
+        return int(pdfinfo_from_path(pdf_path, poppler_path=self.poppler_path)['Pages'])
+
+    def render(self, pdf_path, page_number):
+        from pdf2image import convert_from_path
+        images = convert_from_path(pdf_path, self.dpi, first_page=page_number, last_page=page_number,
+                                   poppler_path=self.poppler_path)
+        return images[0]
+
+    def render_all(self, pdf_path):
+        from pdf2image import convert_from_path
+        return convert_from_path(pdf_path, self.dpi, poppler_path=self.poppler_path)
+
+
+class TesseractBackend:
+    """OCR con tesseract (pytesseract)."""
+
+    def __init__(self, language='spa', tesseract_cmd=None, config=''):
+        self.language = language
+        self.tesseract_cmd = tesseract_cmd
+        self.config = config
+
+    @property
+    def cache_tag(self):
+        config_hash = hashlib.sha1(self.config.encode('utf-8')).hexdigest()[:8]
+        return f"tesseract-{self.language}-{config_hash}"
+
+    def _pytesseract(self):
+        import pytesseract
+        if self.tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = self.tesseract_cmd
+        return pytesseract
+
+    def version(self):
+        return self._pytesseract().get_tesseract_version()
+
+    def recognize(self, image):
+        return self._pytesseract().image_to_string(image, lang=self.language, config=self.config)
+
+
+class PageCache:
+    """Guarda el texto de cada página en disco, indexado por el contenido del PDF."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def document_key(pdf_path):
+        digest = hashlib.sha256()
+        with open(pdf_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _path(self, doc_key, tag, page_number):
+        return os.path.join(self.cache_dir, doc_key[:2], f"{doc_key}_{tag}_p{page_number}.txt")
+
+    def get(self, doc_key, tag, page_number):
+        try:
+            with open(self._path(doc_key, tag, page_number), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, doc_key, tag, page_number, text):
+        path = self._path(doc_key, tag, page_number)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+def _recognize_page(backend, image):
+    # Mejora de imagen para OCR
+    image = image.convert('L')  # Escala de grises
+    try:
+        return backend.recognize(image)
+    except Exception as e:
+        print(f"Error in OCR processing: {e}")
+        print("Make sure tesseract is installed: sudo apt-get install tesseract-ocr tesseract-ocr-spa")
+        return None
+
+
+def _ocr_page(rasterizer, backend, cache, pdf_path, page_number, doc_key, image=None):
+    """Rasteriza y transcribe una página, pasando primero por la caché."""
+    tag = f"{rasterizer.cache_tag}_{backend.cache_tag}"
+    if cache is not None:
+        text = cache.get(doc_key, tag, page_number)
+        if text is not None:
+            return text
+
+    if image is None:
+        try:
+            image = rasterizer.render(pdf_path, page_number)
+        except Exception as e:
+            print(f"Error converting page {page_number} of {pdf_path}: {e}")
+            return None
+
+    text = _recognize_page(backend, image)
+    if text is not None and cache is not None:
+        cache.put(doc_key, tag, page_number, text)
+    return text
+
+
+# Estado de cada proceso trabajador (se llena una sola vez en el initializer)
+_worker = {}
+
+
+def _init_ocr_worker(rasterizer, backend, cache_dir, memory_mb):
+    init_worker(memory_mb)
+    _worker['rasterizer'] = rasterizer
+    _worker['backend'] = backend
+    _worker['cache'] = PageCache(cache_dir) if cache_dir else None
+
+
+def _ocr_page_job(job):
+    pdf_path, page_number, doc_key = job
+    return _ocr_page(_worker['rasterizer'], _worker['backend'], _worker['cache'], pdf_path, page_number, doc_key)
+
+
+class OcrEngine:
+    """Digitaliza PDFs: rasteriza, aplica OCR, escribe el .txt y alimenta el índice."""
+
+    def __init__(self, rasterizer=None, backend=None, workers=1, memory_per_worker_mb=None,
+                 cache_dir=None, streaming=True):
+        self.rasterizer = rasterizer or Pdf2ImageRasterizer()
+        self.backend = backend or TesseractBackend()
+        self.workers = max(1, workers or default_workers())
+        self.memory_per_worker_mb = memory_per_worker_mb
+        self.cache_dir = cache_dir
+        self.cache = PageCache(cache_dir) if cache_dir else None
+        self.streaming = streaming
+        self._pool = None
+
+    # -- pool de procesos -------------------------------------------------
+
+    @property
+    def parallel(self):
+        # Con límite de memoria también usamos un proceso aparte,
+        # para no limitar al proceso principal
+        return self.workers > 1 or bool(self.memory_per_worker_mb)
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_ocr_worker,
+                initargs=(self.rasterizer, self.backend, self.cache_dir, self.memory_per_worker_mb),
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- páginas ------------------------------------------------------------
+
+    def _iter_pages(self, pdf_path, num_pages, doc_key):
+        """Genera (número de página, texto) en orden, conforme van quedando."""
+        page_numbers = range(1, num_pages + 1)
+
+        if self.parallel:
+            jobs = [(pdf_path, n, doc_key) for n in page_numbers]
+            yield from zip(page_numbers, self._get_pool().map(_ocr_page_job, jobs))
+            return
+
+        if self.streaming:
+            for n in page_numbers:
+                yield n, _ocr_page(self.rasterizer, self.backend, self.cache, pdf_path, n, doc_key)
+            return
+
+        # Sin streaming: una sola llamada a poppler para todo el documento
+        images = self.rasterizer.render_all(pdf_path)
+        for n, image in zip(page_numbers, images):
+            yield n, _ocr_page(self.rasterizer, self.backend, self.cache, pdf_path, n, doc_key, image=image)
+
+    # -- documentos ---------------------------------------------------------
+
+    def process_document(self, pdf_path, output_txt_path, index=None):
+        print(f"Convirtiendo PDF {pdf_path} a imágenes...")
+
+        try:
+            num_pages = self.rasterizer.page_count(pdf_path)
+        except Exception as e:
+            print(f"Error converting PDF to images: {e}")
+            print("Make sure poppler is installed: sudo apt-get install poppler-utils")
+            return None
+
+        doc_key = PageCache.document_key(pdf_path) if self.cache else None
+        doc_id = index.begin_document(pdf_path, output_txt_path) if index else None
+
+        all_text = []
+        offset = 0
+
+        for page_number, text in self._iter_pages(pdf_path, num_pages, doc_key):
+            print(f"Procesando página {page_number}/{num_pages}...")
+            if text is None:
+                continue
+
+            # Limpia el texto
+            text = re.sub(r'\n{3,}', '\n\n', text)  # Quita líneas excesivas
+
+            # Agrega un separador de páginas
+            page_header = f"\n\n----- PÁGINA {page_number} -----\n\n"
+            all_text.append(page_header + text)
+
+            # Indexa la página en cuanto termina (offset = posición en el .txt)
+            offset += len(page_header)
+            if index:
+                index.add_page(doc_id, page_number, offset, text)
+            offset += len(text)
+
+        # Guarda el texto a un archivo .txt
+        try:
+            with open(output_txt_path, 'w', encoding='utf-8') as f:
+                f.write(''.join(all_text))
+            print(f"OCR completo! Texto guardado en {output_txt_path}")
+        except Exception as e:
+            print(f"Error saving file: {e}")
+            return None
+
+        return ''.join(all_text)
+
+    def process_folder(self, folder_path, output_folder=None, index_path=None, use_index=True):
+        return self.process_files(sorted(glob.glob(os.path.join(folder_path, "*.pdf"))),
+                                  output_folder or folder_path, index_path, use_index, source=folder_path)
+
+    def process_files(self, pdf_files, output_folder, index_path=None, use_index=True, source=None):
+        os.makedirs(output_folder, exist_ok=True)
+
+        if not pdf_files:
+            print(f"No PDF files found in {source or output_folder}")
+            return
+
+        print(f"Found {len(pdf_files)} PDF files to process")
+
+        # The search index lives next to the .txt files unless told otherwise
+        if index_path is None:
+            index_path = os.path.join(output_folder, DEFAULT_INDEX_NAME)
+        index = OcrIndex(index_path) if use_index else None
+
+        try:
+            for idx, pdf_path in enumerate(pdf_files, 1):
+                print(f"\n===== Processing file {idx}/{len(pdf_files)}: {os.path.basename(pdf_path)} =====")
+
+                pdf_name_without_ext = os.path.splitext(os.path.basename(pdf_path))[0]
+                output_txt_path = os.path.join(output_folder, f"{pdf_name_without_ext}.txt")
+
+                try:
+                    result = self.process_document(pdf_path, output_txt_path, index=index)
+
+                    if result:
+                        print(f"Successfully processed: {os.path.basename(pdf_path)}")
+                    else:
+                        print(f"Failed to process: {os.path.basename(pdf_path)}")
+
+                except Exception as e:
+                    print(f"Error processing {os.path.basename(pdf_path)}: {str(e)}")
+                    continue
+        finally:
+            if index:
+                index.close()
+
+        print(f"\n===== Batch processing complete! =====")
+        if index:
+            print(f"Search index: {index_path} (python ocr_index.py {index_path} <words>)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe PDFs escaneados a .txt con OCR.")
+    parser.add_argument('inputs', nargs='+', help="carpetas o archivos PDF")
+    parser.add_argument('-o', '--output', help="carpeta de salida (por defecto, junto a cada PDF)")
+    parser.add_argument('-l', '--lang', default='spa', help="idioma(s) de tesseract, p. ej. spa o spa+eng")
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="procesos para OCR en paralelo (0 = todos los núcleos)")
+    parser.add_argument('--memory-per-worker', type=int, metavar='MB',
+                        help="límite de memoria por proceso trabajador")
+    parser.add_argument('--cache-dir', help="carpeta para la caché de páginas ya transcritas")
+    parser.add_argument('--no-stream', action='store_true',
+                        help="rasteriza el documento completo de una vez (más memoria)")
+    parser.add_argument('--index', metavar='RUTA',
+                        help=f"un solo índice de búsqueda para todas las entradas "
+                             f"(por defecto, {DEFAULT_INDEX_NAME} en cada carpeta de salida)")
+    parser.add_argument('--no-index', action='store_true', help="no actualizar el índice de búsqueda")
+    parser.add_argument('--poppler-path', help="carpeta con los binarios de poppler (Windows)")
+    parser.add_argument('--tesseract-cmd', help="ruta al ejecutable de tesseract")
+    args = parser.parse_args(argv)
+
+    backend = TesseractBackend(args.lang, tesseract_cmd=args.tesseract_cmd)
+    try:
+        version = backend.version()
+        print(f"Tesseract version {version} is available!")
+    except Exception:
+        print("Tesseract not found. Please install with:")
+        print("sudo apt-get install tesseract-ocr tesseract-ocr-spa")
+        return 1
+
+    engine = OcrEngine(
+        rasterizer=Pdf2ImageRasterizer(args.dpi, poppler_path=args.poppler_path),
+        backend=backend,
+        workers=args.workers,
+        memory_per_worker_mb=args.memory_per_worker,
+        cache_dir=args.cache_dir,
+        streaming=not args.no_stream,
+    )
+
+    with engine:
+        for path in args.inputs:
+            if os.path.isdir(path):
+                engine.process_folder(path, args.output, index_path=args.index, use_index=not args.no_index)
+            elif os.path.isfile(path):
+                engine.process_files([path], args.output or os.path.dirname(path) or '.',
+                                     index_path=args.index, use_index=not args.no_index)
+            else:
+                print(f"Folder not found: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,158 @@
+"""
+Índice de búsqueda de texto completo sobre las
+transcripciones OCR que produce el digitalizador.
+
+Usa SQLite FTS5, así que no hay que instalar nada,
+y el tokenizador ignora acentos: buscar "educacion"
+encuentra "educación".
+"""
+
+import argparse
+import os
+import sqlite3
+
+DEFAULT_INDEX_NAME = "ocr_index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    pdf_path TEXT UNIQUE NOT NULL,
+    txt_path TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    text,
+    document_id UNINDEXED,
+    page UNINDEXED,
+    offset UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+-- Las columnas UNINDEXED de FTS5 no tienen índice: para borrar las páginas
+-- de un documento sin recorrer toda la tabla, aquí va cada rowid de pages
+CREATE TABLE IF NOT EXISTS page_rows (
+    page_rowid INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS page_rows_document ON page_rows (document_id);
+"""
+SCHEMA_VERSION = 1
+
+
+class OcrIndex:
+    """Índice invertido incremental de las páginas transcritas."""
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.conn = sqlite3.connect(index_path)
+        self.conn.executescript(SCHEMA)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Índice de antes de page_rows: se llena una sola vez con lo que ya tenía
+            with self.conn:
+                self.conn.execute("INSERT OR IGNORE INTO page_rows (page_rowid, document_id) "
+                                  "SELECT rowid, document_id FROM pages")
+                self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def begin_document(self, pdf_path, txt_path=None):
+        """Registra un documento y borra lo que hubiera de una corrida anterior."""
+        pdf_path = os.path.abspath(pdf_path)
+        txt_path = os.path.abspath(txt_path) if txt_path else None
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO documents (pdf_path, txt_path) VALUES (?, ?) "
+                "ON CONFLICT(pdf_path) DO UPDATE SET txt_path = excluded.txt_path",
+                (pdf_path, txt_path),
+            )
+            doc_id = self.conn.execute(
+                "SELECT id FROM documents WHERE pdf_path = ?", (pdf_path,)
+            ).fetchone()[0]
+            self.conn.execute(
+                "DELETE FROM pages WHERE rowid IN (SELECT page_rowid FROM page_rows WHERE document_id = ?)",
+                (doc_id,),
+            )
+            self.conn.execute("DELETE FROM page_rows WHERE document_id = ?", (doc_id,))
+        return doc_id
+
+    def add_page(self, doc_id, page_number, offset, text):
+        """Agrega una página; se guarda en cuanto termina para no perder nada."""
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO pages (text, document_id, page, offset) VALUES (?, ?, ?, ?)",
+                (text, doc_id, page_number, offset),
+            )
+            self.conn.execute("INSERT INTO page_rows (page_rowid, document_id) VALUES (?, ?)",
+                              (cursor.lastrowid, doc_id))
+
+    def search(self, query, limit=20):
+        """Regresa los resultados ordenados por relevancia (bm25)."""
+        match = _to_match_expression(query)
+        if not match:
+            return []
+        rows = self.conn.execute(
+            "SELECT d.pdf_path, d.txt_path, p.page, p.offset, "
+            "snippet(pages, 0, '[', ']', '…', 12), bm25(pages) AS score "
+            "FROM pages p JOIN documents d ON d.id = p.document_id "
+            "WHERE pages MATCH ? ORDER BY score LIMIT ?",
+            (match, limit),
+        ).fetchall()
+        return [
+            {
+                'pdf_path': pdf_path,
+                'txt_path': txt_path,
+                'page': page,
+                'offset': offset,
+                'snippet': snippet,
+                'score': score,
+            }
+            for pdf_path, txt_path, page, offset, snippet, score in rows
+        ]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _to_match_expression(query):
+    # Cada palabra va entre comillas para que la sintaxis de FTS5 no truene
+    # con guiones o paréntesis del texto; un '*' al final busca por prefijo
+    terms = []
+    for word in query.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Busca texto en las transcripciones OCR.")
+    parser.add_argument('index', help=f"ruta al índice ({DEFAULT_INDEX_NAME}) o a la carpeta que lo contiene")
+    parser.add_argument('query', nargs='+', help="palabras a buscar (usa palabra* para prefijos)")
+    parser.add_argument('-n', '--limit', type=int, default=20, help="número máximo de resultados")
+    args = parser.parse_args(argv)
+
+    index_path = args.index
+    if os.path.isdir(index_path):
+        index_path = os.path.join(index_path, DEFAULT_INDEX_NAME)
+    if not os.path.exists(index_path):
+        print(f"No existe el índice {index_path}")
+        return 1
+
+    with OcrIndex(index_path) as index:
+        hits = index.search(' '.join(args.query), limit=args.limit)
+
+    if not hits:
+        print("Sin resultados.")
+        return 0
+
+    for hit in hits:
+        print(f"{os.path.basename(hit['pdf_path'])} · página {hit['page']} · offset {hit['offset']}")
+        print(f"    {hit['snippet']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
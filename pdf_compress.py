@@ -0,0 +1,469 @@
+"""
+Compresión de PDFs (sobre todo escaneados).
+
+PDF compressor.py solo ponía /Filter y /BitsPerComponent en la
+raíz del documento, lo que no reduce nada. Aquí se trabaja sobre
+lo que de verdad pesa:
+
+- imágenes: se calcula a cuántos DPI se dibuja cada una en la
+  página, se reduce a los DPI deseados y se vuelve a codificar
+  como JPEG (con la calidad indicada) o Flate (sin pérdida)
+- flujos de contenido sin comprimir: se comprimen con Flate
+- metadatos: se quitan
+- objetos repetidos: se deja una sola copia (pdf_dedup.py)
+
+Al final dice cuántos bytes se ahorraron por página y en total.
+
+Con carpetas o patrones comprime muchos archivos en paralelo (un
+proceso por núcleo, con límite de memoria opcional) y se salta los
+que ya tienen una salida más nueva que el original.
+
+Uso:
+    python pdf_compress.py archivo.pdf [-o salida.pdf] [--dpi 150] [--quality 75] [--format auto] [--no-dedup]
+    python pdf_compress.py carpeta 'otros/**/*.pdf' [-d salidas] [-j 8] [--memory-per-worker 1500] [--force]
+"""
+
+import argparse
+import glob
+import math
+import os
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.errors import PdfReadError
+from PyPDF2.generic import ContentStream, EncodedStreamObject, IndirectObject, NameObject, NumberObject
+
+from pdf_dedup import deduplicate_streams
+from resource_limits import default_workers, init_worker
+
+DEFAULT_DPI = 150
+DEFAULT_QUALITY = 75
+COMPRESSED_SUFFIX = '_compressed'
+IMAGE_FORMATS = ('auto', 'jpeg', 'flate')
+
+# Solo se reduce una imagen si está al menos este tanto por encima de los DPI deseados
+DOWNSAMPLE_THRESHOLD = 1.25
+MAX_FORM_DEPTH = 8
+IDENTITY = (1, 0, 0, 1, 0, 0)
+
+PageSavings = namedtuple('PageSavings', ['page', 'before', 'after', 'images'])
+CompressResult = namedtuple('CompressResult', ['input_path', 'output_path', 'input_size', 'output_size', 'pages',
+                                               'deduplicated'])
+BatchSummary = namedtuple('BatchSummary', ['results', 'errors', 'skipped', 'elapsed'])
+
+
+def _multiply(m, n):
+    """Producto de dos matrices de transformación de PDF [a b c d e f]."""
+    a, b, c, d, e, f = m
+    A, B, C, D, E, F = n
+    return (a * A + b * C, a * B + b * D,
+            c * A + d * C, c * B + d * D,
+            e * A + f * C + E, e * B + f * D + F)
+
+
+def _has_xobjects(resources):
+    return resources is not None and bool(resources.get_object().get('/XObject'))
+
+
+def _find_images(pdf, contents, resources, ctm, found, depth=0):
+    """Anota, para cada imagen, el tamaño más grande (en pulgadas) al que se dibuja.
+
+    Sigue la matriz de transformación (q, Q, cm) hasta cada Do; las
+    imágenes dentro de formularios (Form XObjects) también cuentan.
+    found es {idnum: [ref, ancho, alto]}.
+    """
+    if not _has_xobjects(resources):
+        return
+    xobjects = resources.get_object()['/XObject'].get_object()
+    stack = []
+    for operands, operator in ContentStream(contents, pdf).operations:
+        if operator == b'q':
+            stack.append(ctm)
+        elif operator == b'Q':
+            if stack:
+                ctm = stack.pop()
+        elif operator == b'cm':
+            ctm = _multiply(tuple(float(x) for x in operands), ctm)
+        elif operator == b'Do':
+            ref = xobjects.raw_get(operands[0]) if operands[0] in xobjects else None
+            if not isinstance(ref, IndirectObject):
+                continue
+            xobject = ref.get_object()
+            subtype = xobject.get('/Subtype')
+            if subtype == '/Image':
+                width = math.hypot(ctm[0], ctm[1]) / 72
+                height = math.hypot(ctm[2], ctm[3]) / 72
+                entry = found.setdefault(ref.idnum, [ref, 0.0, 0.0])
+                entry[1] = max(entry[1], width)
+                entry[2] = max(entry[2], height)
+            elif subtype == '/Form' and depth < MAX_FORM_DEPTH:
+                matrix = tuple(float(x) for x in xobject.get('/Matrix', IDENTITY))
+                _find_images(pdf, xobject, xobject.get('/Resources', resources),
+                             _multiply(matrix, ctm), found, depth + 1)
+
+
+def _filters(obj):
+    filters = obj.get('/Filter')
+    if filters is None:
+        return []
+    filters = filters.get_object()
+    return [filters] if isinstance(filters, str) else list(filters)
+
+
+def _image_mode(obj):
+    """Modo de PIL equivalente al espacio de color, o None si no se sabe manejar."""
+    colorspace = obj.get('/ColorSpace')
+    if colorspace is None:
+        return None
+    colorspace = colorspace.get_object()
+    if isinstance(colorspace, str):
+        return {'/DeviceGray': 'L', '/DeviceRGB': 'RGB'}.get(colorspace)
+    if colorspace[0] == '/ICCBased':
+        return {1: 'L', 3: 'RGB'}.get(colorspace[1].get_object().get('/N'))
+    return None
+
+
+def _load_image(obj, size_hint=None):
+    """Abre una imagen del PDF con PIL; None si es de un tipo que se deja como está.
+
+    Se dejan intactas las máscaras, las de 1 bit (CCITT/JBIG2), las indexadas,
+    las CMYK y las que traen /Decode, que no se pueden reescribir sin cambiar
+    cómo se ven.
+    """
+    from PIL import Image
+
+    mode = _image_mode(obj)
+    if mode is None or obj.get('/ImageMask') or obj.get('/BitsPerComponent') != 8 or '/Decode' in obj:
+        return None
+    size = (int(obj['/Width']), int(obj['/Height']))
+    filters = _filters(obj)
+    if filters == ['/DCTDecode']:
+        image = Image.open(BytesIO(obj._data))
+        if image.mode != mode:
+            return None
+        if size_hint:
+            # JPEG puede decodificarse ya reducido (1/2, 1/4, 1/8): más rápido y con menos memoria
+            image.draft(mode, size_hint)
+        return image
+    if filters in ([], ['/FlateDecode']):
+        return Image.frombytes(mode, size, obj.get_data())
+    return None
+
+
+def _encode_image(image, image_format, quality, was_jpeg):
+    """Regresa (datos, filtro) de la imagen ya codificada."""
+    if image_format == 'auto':
+        # Lo que ya era JPEG o tiene muchos colores (fotos, escaneos a color) va a JPEG;
+        # lo de pocos colores (texto, dibujos) queda mejor y más nítido con Flate
+        image_format = 'jpeg' if was_jpeg or image.getcolors(256) is None else 'flate'
+    if image_format == 'jpeg':
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=quality, optimize=True)
+        return buffer.getvalue(), '/DCTDecode'
+    return zlib.compress(image.tobytes()), '/FlateDecode'
+
+
+def recompress_image(obj, width_in, height_in, target_dpi=DEFAULT_DPI, quality=DEFAULT_QUALITY,
+                     image_format='auto'):
+    """Reduce y recodifica una imagen dibujada a width_in x height_in pulgadas.
+
+    Regresa el nuevo objeto, o None si no se pudo o no quedaba más chico.
+    """
+    width, height = int(obj['/Width']), int(obj['/Height'])
+    scale = 1.0
+    if width_in > 0 and height_in > 0:
+        dpi = min(width / width_in, height / height_in)
+        if dpi > target_dpi * DOWNSAMPLE_THRESHOLD:
+            scale = target_dpi / dpi
+    new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+
+    try:
+        image = _load_image(obj, new_size if scale < 1 else None)
+        if image is None:
+            return None
+        if image.size != new_size:
+            from PIL import Image
+            image = image.resize(new_size, Image.LANCZOS)
+        data, filter_name = _encode_image(image, image_format, quality, _filters(obj) == ['/DCTDecode'])
+    except (OSError, ValueError, NotImplementedError, PdfReadError):
+        return None
+    if len(data) >= len(obj._data):
+        return None
+
+    new = EncodedStreamObject()
+    for key, value in obj.items():
+        if key not in ('/Filter', '/DecodeParms', '/Length'):
+            new[key] = value
+    new[NameObject('/Width')] = NumberObject(image.width)
+    new[NameObject('/Height')] = NumberObject(image.height)
+    new[NameObject('/Filter')] = NameObject(filter_name)
+    new._data = data
+    return new
+
+
+def _replace(writer, ref, obj):
+    """Pone obj en lugar del objeto ref dentro del writer."""
+    obj.indirect_reference = ref
+    writer._objects[ref.idnum - 1] = obj
+
+
+def _content_refs(page):
+    contents = page.raw_get('/Contents') if '/Contents' in page else None
+    if contents is None:
+        return []
+    if isinstance(contents, IndirectObject) and not isinstance(contents.get_object(), list):
+        return [contents]
+    return [ref for ref in contents.get_object() if isinstance(ref, IndirectObject)]
+
+
+def compress_writer(writer, target_dpi=DEFAULT_DPI, quality=DEFAULT_QUALITY, image_format='auto'):
+    """Comprime en su lugar las páginas de un PdfWriter; regresa un PageSavings por página.
+
+    Una imagen compartida por varias páginas se reduce una sola vez, a los
+    DPI de donde se dibuja más grande, y su ahorro cuenta en la primera
+    página que la usa.
+    """
+    found = {}
+    page_images = []
+    for page in writer.pages:
+        before = set(found)
+        if _has_xobjects(page.get('/Resources')) and '/Contents' in page:
+            _find_images(writer, page.get_contents(), page['/Resources'], IDENTITY, found)
+        page_images.append([idnum for idnum in found if idnum not in before])
+
+    savings = []
+    for number, (page, image_ids) in enumerate(zip(writer.pages, page_images), start=1):
+        before = after = images = 0
+        for idnum in image_ids:
+            ref, width_in, height_in = found[idnum]
+            obj = ref.get_object()
+            before += len(obj._data)
+            new = recompress_image(obj, width_in, height_in, target_dpi, quality, image_format)
+            if new is not None:
+                _replace(writer, ref, new)
+                obj = new
+                images += 1
+            after += len(obj._data)
+
+        for ref in _content_refs(page):
+            stream = ref.get_object()
+            before += len(stream._data)
+            if '/Filter' not in stream:
+                encoded = stream.flate_encode()
+                if len(encoded._data) < len(stream._data):
+                    _replace(writer, ref, encoded)
+                    stream = encoded
+            after += len(stream._data)
+        savings.append(PageSavings(number, before, after, images))
+    return savings
+
+
+def strip_metadata(writer):
+    """Quita la información del documento y los metadatos XMP de las páginas."""
+    writer.get_object(writer._info).clear()
+    writer._root_object.pop('/Metadata', None)
+    for page in writer.pages:
+        page.pop('/Metadata', None)
+        page.pop('/PieceInfo', None)
+
+
+def default_output_path(input_path, output_dir=None):
+    name = os.path.splitext(os.path.basename(input_path))[0] + COMPRESSED_SUFFIX + ".pdf"
+    return os.path.join(output_dir or os.path.dirname(input_path), name)
+
+
+def compress_pdf(input_path, output_path=None, target_dpi=DEFAULT_DPI, quality=DEFAULT_QUALITY,
+                 image_format='auto', remove_metadata=True, dedupe=True):
+    """Comprime un PDF; por defecto la salida va junto a él con el sufijo _compressed."""
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Formato de imagen desconocido: {image_format}")
+    output_path = output_path or default_output_path(input_path)
+
+    writer = PdfWriter()
+    for page in PdfReader(input_path).pages:
+        writer.add_page(page)
+    pages = compress_writer(writer, target_dpi, quality, image_format)
+    if remove_metadata:
+        strip_metadata(writer)
+    deduplicated = deduplicate_streams(writer).objects if dedupe else 0
+
+    # Se escribe a un temporal para no dejar un PDF a medias si algo falla
+    tmp_path = output_path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as out_file:
+            writer.write(out_file)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return CompressResult(input_path, output_path, os.path.getsize(input_path),
+                          os.path.getsize(output_path), pages, deduplicated)
+
+
+# -- varios archivos a la vez ----------------------------------------------
+
+def find_pdfs(inputs):
+    """Expande carpetas y patrones (p. ej. 'escaneos/**/*.pdf') en la lista de PDFs.
+
+    Deja fuera los que ya son salida de una corrida anterior (_compressed.pdf).
+    """
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths = [entry.path for entry in os.scandir(item)
+                     if entry.is_file() and entry.name.lower().endswith('.pdf')]
+        elif glob.has_magic(item):
+            paths = glob.glob(item, recursive=True)
+        else:
+            paths = [item]
+        found += [path for path in paths
+                  if not os.path.splitext(path)[0].endswith(COMPRESSED_SUFFIX)]
+    return sorted(dict.fromkeys(found))
+
+
+def is_up_to_date(input_path, output_path):
+    """True si la salida ya existe y es más nueva que el PDF original."""
+    try:
+        return os.stat(output_path).st_mtime_ns >= os.stat(input_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def _compress_job(job):
+    input_path, output_path, options = job
+    return compress_pdf(input_path, output_path, **options)
+
+
+def compress_batch(inputs, output_dir=None, workers=None, memory_per_worker_mb=None, force=False,
+                   on_result=None, **options):
+    """Comprime muchos PDFs en un pool de procesos.
+
+    Se saltan los que ya tienen una salida más nueva que el original (a menos
+    que force). Con memory_per_worker_mb, un documento que no cabe falla solo
+    él, sin tumbar a la máquina. on_result(resultado) se llama conforme
+    termina cada archivo.
+    """
+    files = find_pdfs(inputs)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    jobs = [(path, default_output_path(path, output_dir), options) for path in files]
+
+    outputs = {}
+    for input_path, output_path, _ in jobs:
+        other = outputs.setdefault(os.path.normcase(os.path.abspath(output_path)), input_path)
+        if other != input_path:
+            raise ValueError(f"{other} y {input_path} irían al mismo archivo: {output_path}")
+
+    todo = [job for job in jobs if force or not is_up_to_date(job[0], job[1])]
+    results, errors = [], []
+    start = time.perf_counter()
+
+    def collect(input_path, result=None, error=None):
+        if error is None:
+            results.append(result)
+            if on_result:
+                on_result(result)
+        else:
+            errors.append((input_path, error))
+            print(f"Error con {os.path.basename(input_path)}: {error.__class__.__name__}: {error}")
+
+    workers = max(1, workers or default_workers())
+    if workers == 1 and not memory_per_worker_mb:
+        for job in todo:
+            try:
+                collect(job[0], _compress_job(job))
+            except Exception as e:
+                collect(job[0], error=e)
+    elif todo:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo)), initializer=init_worker,
+                                 initargs=(memory_per_worker_mb,)) as pool:
+            futures = {pool.submit(_compress_job, job): job[0] for job in todo}
+            for future in as_completed(futures):
+                try:
+                    collect(futures[future], future.result())
+                except Exception as e:
+                    collect(futures[future], error=e)
+
+    return BatchSummary(results, errors, len(jobs) - len(todo), time.perf_counter() - start)
+
+
+def _size(n):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(n) < 1024 or unit == 'MB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def print_report(result, per_page=True):
+    if per_page:
+        for page in result.pages:
+            print(f"  Página {page.page}: {_size(page.before)} -> {_size(page.after)} "
+                  f"(ahorro {_size(page.before - page.after)}, {page.images} imágenes recomprimidas)")
+    saved = result.input_size - result.output_size
+    percent = 100 * saved / result.input_size if result.input_size else 0
+    if result.deduplicated:
+        print(f"  {result.deduplicated} objetos repetidos se guardaron una sola vez")
+    print(f"{os.path.basename(result.input_path)}: {_size(result.input_size)} -> {_size(result.output_size)} "
+          f"(ahorro {_size(saved)}, {percent:.1f}%). Guardado en: {result.output_path}")
+
+
+def print_summary(summary):
+    results = summary.results
+    input_size = sum(r.input_size for r in results)
+    output_size = sum(r.output_size for r in results)
+    pages = sum(len(r.pages) for r in results)
+    elapsed = summary.elapsed or 1e-9
+
+    print(f"\n{len(results)} PDFs comprimidos, {summary.skipped} ya estaban al día, {len(summary.errors)} con error.")
+    if results:
+        print(f"{pages} páginas en {summary.elapsed:.1f} s: {len(results) / elapsed:.2f} archivos/s, "
+              f"{pages / elapsed:.1f} páginas/s, {input_size / elapsed / 1024 ** 2:.1f} MB/s")
+        print(f"{_size(input_size)} -> {_size(output_size)} "
+              f"(razón {output_size / input_size if input_size else 1:.3f}, ahorro {_size(input_size - output_size)})")
+    for input_path, error in summary.errors:
+        print(f"  Falló: {input_path}: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comprime PDFs reduciendo y recodificando sus imágenes.")
+    parser.add_argument('inputs', nargs='+', help="archivos PDF, carpetas o patrones ('escaneos/**/*.pdf')")
+    parser.add_argument('-o', '--output', help="archivo de salida, con un solo PDF (por defecto, <nombre>_compressed.pdf)")
+    parser.add_argument('-d', '--output-dir', help="carpeta para las salidas (por defecto, junto a cada PDF)")
+    parser.add_argument('-j', '--workers', type=int, default=0,
+                        help="procesos en paralelo para varios archivos (0 = todos los núcleos)")
+    parser.add_argument('--memory-per-worker', type=int, metavar='MB', help="límite de memoria por proceso")
+    parser.add_argument('-f', '--force', action='store_true',
+                        help="vuelve a comprimir aunque la salida ya sea más nueva que el original")
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI, help="resolución máxima de las imágenes")
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY, help="calidad JPEG (1-95)")
+    parser.add_argument('--format', choices=IMAGE_FORMATS, default='auto',
+                        help="cómo recodificar las imágenes (auto: JPEG para fotos, Flate para texto)")
+    parser.add_argument('--keep-metadata', action='store_true', help="no quitar los metadatos")
+    parser.add_argument('--no-dedup', action='store_true', help="no juntar objetos repetidos")
+    parser.add_argument('-q', '--quiet', action='store_true', help="solo el resumen, sin el detalle por página")
+    args = parser.parse_args(argv)
+
+    options = dict(target_dpi=args.dpi, quality=args.quality, image_format=args.format,
+                   remove_metadata=not args.keep_metadata, dedupe=not args.no_dedup)
+
+    if len(args.inputs) == 1 and os.path.isfile(args.inputs[0]) and not args.output_dir:
+        # Un solo archivo: siempre se comprime y se muestra el detalle por página
+        result = compress_pdf(args.inputs[0], args.output, **options)
+        print_report(result, per_page=not args.quiet)
+        return 0
+    if args.output:
+        parser.error("-o es para un solo archivo; con varios usa -d/--output-dir")
+
+    summary = compress_batch(args.inputs, args.output_dir, workers=args.workers,
+                             memory_per_worker_mb=args.memory_per_worker, force=args.force,
+                             on_result=None if args.quiet else lambda r: print_report(r, per_page=False),
+                             **options)
+    print_summary(summary)
+    return 1 if summary.errors else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+"""
+Quita objetos repetidos de un PdfWriter antes de escribirlo.
+
+Al copiar páginas una por una, lo que comparten (fuentes, un logo
+en cada página, el mismo archivo cosido dos veces) puede quedar
+escrito varias veces. deduplicate_streams busca flujos idénticos
+(mismo diccionario y mismos datos) y deja una sola copia a la que
+apuntan todas las referencias. También junta fuentes y estados
+gráficos iguales, que suelen volverse idénticos una vez que sus
+flujos ya se juntaron.
+
+Lo usan pdf_compress.py y pdf_stitcher.py justo antes de escribir.
+"""
+
+import hashlib
+from collections import namedtuple
+from io import BytesIO
+
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NullObject, StreamObject
+
+# Diccionarios (sin flujo) que se pueden compartir sin problema. Las páginas
+# no: un visor no acepta la misma página dos veces en el árbol.
+SHAREABLE_TYPES = ('/Font', '/FontDescriptor', '/ExtGState', '/Encoding')
+MAX_PASSES = 5
+
+DedupResult = namedtuple('DedupResult', ['objects', 'bytes'])
+
+
+def _dictionary_bytes(obj):
+    buffer = BytesIO()
+    DictionaryObject.write_to_stream(obj, buffer, None)
+    return buffer.getvalue()
+
+
+def _candidates(writer):
+    """Agrupa por (diccionario, tamaño de los datos); solo esos grupos pueden tener duplicados."""
+    groups = {}
+    for index, obj in enumerate(writer._objects):
+        if isinstance(obj, StreamObject):
+            key = (_dictionary_bytes(obj), len(obj._data))
+        elif isinstance(obj, DictionaryObject) and obj.get('/Type') in SHAREABLE_TYPES:
+            key = (_dictionary_bytes(obj), None)
+        else:
+            continue
+        groups.setdefault(key, []).append(index)
+    return [indices for indices in groups.values() if len(indices) > 1]
+
+
+def _find_duplicates(writer):
+    """Regresa {idnum duplicado: referencia a la copia que se queda}."""
+    duplicates = {}
+    for indices in _candidates(writer):
+        first = writer._objects[indices[0]]
+        if not isinstance(first, StreamObject):
+            # Mismo diccionario serializado: ya son idénticos
+            keep = IndirectObject(indices[0] + 1, 0, writer)
+            duplicates.update((index + 1, keep) for index in indices[1:])
+            continue
+        # Mismo diccionario y tamaño: ahora sí vale la pena leer los datos
+        by_hash = {}
+        for index in indices:
+            digest = hashlib.sha256(writer._objects[index]._data).digest()
+            if digest in by_hash:
+                duplicates[index + 1] = by_hash[digest]
+            else:
+                by_hash[digest] = IndirectObject(index + 1, 0, writer)
+    return duplicates
+
+
+def _remap(obj, duplicates, writer):
+    """Cambia, dentro de obj, las referencias a duplicados por la copia que se queda."""
+    if isinstance(obj, DictionaryObject):
+        items = obj.items()
+    elif isinstance(obj, ArrayObject):
+        items = enumerate(obj)
+    else:
+        return
+    for key, value in list(items):
+        if isinstance(value, IndirectObject):
+            if value.pdf is writer and value.idnum in duplicates:
+                obj[key] = duplicates[value.idnum]
+        elif isinstance(value, (DictionaryObject, ArrayObject)):
+            _remap(value, duplicates, writer)
+
+
+def deduplicate_streams(writer):
+    """Deja una sola copia de cada flujo (y fuente) idéntico del writer.
+
+    Se repite hasta que no cambia nada, porque juntar flujos puede volver
+    idénticos a los objetos que los usan (p. ej. dos imágenes con la misma
+    máscara). Los duplicados quedan como null para no mover la numeración.
+    """
+    removed = 0
+    saved = 0
+    for _ in range(MAX_PASSES):
+        duplicates = _find_duplicates(writer)
+        if not duplicates:
+            break
+        for obj in writer._objects:
+            _remap(obj, duplicates, writer)
+        for idnum in duplicates:
+            obj = writer._objects[idnum - 1]
+            if isinstance(obj, StreamObject):
+                saved += len(obj._data)
+            writer._objects[idnum - 1] = NullObject()
+        removed += len(duplicates)
+    return DedupResult(removed, saved)
@@ -0,0 +1,327 @@
+"""
+Une y parte PDFs sin preguntar nada, a partir de un manifiesto.
+
+Un manifiesto (JSON o YAML) describe de una vez todos los PDFs
+que se quieren armar:
+
+    outputs:
+      - output: unido.pdf
+        sources:
+          - portada.pdf
+          - anexo.pdf:1-3,5
+          - {file: contrato.pdf, pages: "2-"}
+      - split: expediente.pdf     # un PDF por cada `every` páginas
+        every: 10
+        output: partes/expediente_{n:03d}.pdf
+
+Las rutas relativas son relativas al manifiesto. Antes de escribir
+nada se arma el plan completo (se valida cada rango contra el
+número de páginas real) y luego las salidas se escriben en
+paralelo. Las salidas que comparten fuentes van al mismo proceso,
+así que cada fuente se abre una sola vez por proceso; la escritura
+es por partes (pdf_stream_writer.py), con memoria acotada.
+
+Uso:
+    python pdf_manifest.py manifiesto.yaml [-j 4] [-n]
+    python pdf_manifest.py -o unido.pdf a.pdf b.pdf:1-3,5
+    python pdf_manifest.py --split grande.pdf --every 10 [-o 'partes/grande_{n:03d}.pdf']
+"""
+
+import argparse
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pdf_stitcher import ReaderCache, get_pdf_pages, parse_ranges, parse_source
+from pdf_stream_writer import StreamingPdfWriter
+from resource_limits import default_workers, init_worker
+
+DEFAULT_SPLIT_PATTERN = '{stem}_{n:03d}.pdf'
+# Fuentes que un proceso deja abiertas para salidas posteriores; las demás se
+# cierran y se vuelven a abrir (el límite del sistema suele ser 256 o 1024)
+MAX_OPEN_SOURCES = 64
+
+OutputPlan = namedtuple('OutputPlan', ['output', 'selections'])  # selections: [(ruta, [índices])]
+OutputResult = namedtuple('OutputResult', ['output', 'pages', 'error'])
+
+
+class ManifestError(ValueError):
+    pass
+
+
+def load_manifest(path):
+    """Lee un manifiesto JSON o YAML (YAML requiere PyYAML)."""
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith('.json'):
+            return json.load(f)
+        try:
+            import yaml
+        except ImportError:
+            raise ManifestError("Para manifiestos YAML hace falta PyYAML (pip install pyyaml); o usa JSON")
+        return yaml.safe_load(f)
+
+
+def _expand_ranges(page_range, num_pages):
+    """Como parse_ranges, pero acepta '5-' (de la 5 al final)."""
+    parts = []
+    for part in str(page_range).split(','):
+        part = part.strip()
+        parts.append(f"{part}{num_pages}" if part.endswith('-') else part)
+    return parse_ranges(','.join(parts), num_pages)
+
+
+def _source(entry):
+    """Una fuente del manifiesto: 'a.pdf', 'a.pdf:1-3' o {file: a.pdf, pages: '1-3'}."""
+    if isinstance(entry, dict):
+        if 'file' not in entry:
+            raise ManifestError(f"Fuente sin 'file': {entry}")
+        return entry['file'], entry.get('pages')
+    return parse_source(str(entry))
+
+
+class Planner:
+    """Convierte las entradas del manifiesto en OutputPlan, validando todo antes de escribir."""
+
+    def __init__(self, base_dir='.'):
+        self.base_dir = base_dir
+        self.counts = {}
+
+    def _path(self, path):
+        return os.path.normpath(os.path.join(self.base_dir, os.path.expanduser(path)))
+
+    def page_count(self, path):
+        if path not in self.counts:
+            if not os.path.isfile(path):
+                raise ManifestError(f"Archivo no encontrado: {path}")
+            # Se abre, se cuenta y se cierra: con miles de fuentes no se juntan archivos abiertos
+            self.counts[path] = get_pdf_pages(path)
+        return self.counts[path]
+
+    def _pages(self, path, page_range):
+        num_pages = self.page_count(path)
+        if page_range is None:
+            return list(range(num_pages))
+        try:
+            return _expand_ranges(page_range, num_pages)
+        except ValueError as e:
+            raise ManifestError(f"{path}: {e}")
+
+    def plan_entry(self, entry):
+        if not isinstance(entry, dict):
+            raise ManifestError(f"Cada salida debe ser un diccionario: {entry!r}")
+        if 'split' in entry:
+            path = self._path(entry['split'])
+            try:
+                every = int(entry.get('every', 1))
+            except (TypeError, ValueError):
+                raise ManifestError(f"'every' debe ser un número: {entry}")
+            if every < 1:
+                raise ManifestError(f"'every' debe ser al menos 1: {entry}")
+            pages = self._pages(path, entry.get('pages'))
+            stem = os.path.splitext(os.path.basename(path))[0]
+            pattern = entry.get('output') or os.path.join(os.path.dirname(path), DEFAULT_SPLIT_PATTERN)
+            plans = []
+            for n, start in enumerate(range(0, len(pages), every), start=1):
+                chunk = pages[start:start + every]
+                try:
+                    output = pattern.format(stem=stem, n=n, start=chunk[0] + 1, end=chunk[-1] + 1)
+                except (KeyError, IndexError, ValueError) as e:
+                    raise ManifestError(f"Patrón de nombres inválido {pattern!r} (usa {{stem}}, {{n}}, "
+                                        f"{{start}}, {{end}}): {e.__class__.__name__}: {e}")
+                plans.append(OutputPlan(self._path(output), [(path, chunk)]))
+            return plans
+
+        if 'output' not in entry or not entry.get('sources'):
+            raise ManifestError(f"Cada salida necesita 'output' y 'sources' (o 'split'): {entry}")
+        selections = []
+        for source in entry['sources']:
+            path, page_range = _source(source)
+            path = self._path(path)
+            selections.append((path, self._pages(path, page_range)))
+        return [OutputPlan(self._path(entry['output']), selections)]
+
+    def plan(self, manifest):
+        entries = manifest.get('outputs', []) if isinstance(manifest, dict) else manifest
+        if not entries:
+            raise ManifestError("El manifiesto no describe ninguna salida")
+        plans = [p for entry in entries for p in self.plan_entry(entry)]
+
+        seen = set()
+        sources = {os.path.normcase(path) for p in plans for path, _ in p.selections}
+        for p in plans:
+            key = os.path.normcase(p.output)
+            if key in seen:
+                raise ManifestError(f"Dos salidas van al mismo archivo: {p.output}")
+            if key in sources:
+                raise ManifestError(f"La salida sobrescribiría una fuente: {p.output}")
+            seen.add(key)
+        return plans
+
+
+def group_plans(plans, workers):
+    """Reparte las salidas en grupos para los procesos.
+
+    Las que comparten una fuente van juntas (componentes conexos), así la
+    fuente se abre una vez. Si hay menos grupos que procesos, los grupos
+    con muchas salidas (p. ej. partir un PDF enorme) se dividen: cada
+    proceso abre la fuente, pero solo lee las páginas que le tocan.
+    """
+    parent = list(range(len(plans)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner = {}
+    for i, p in enumerate(plans):
+        for path, _ in p.selections:
+            j = owner.setdefault(os.path.normcase(path), i)
+            parent[find(i)] = find(j)
+
+    groups = {}
+    for i, p in enumerate(plans):
+        groups.setdefault(find(i), []).append(p)
+    groups = sorted(groups.values(), key=len, reverse=True)
+
+    while groups and len(groups) < workers and len(groups[0]) > 1:
+        largest = groups.pop(0)
+        half = len(largest) // 2
+        groups += [largest[:half], largest[half:]]
+        groups.sort(key=len, reverse=True)
+    return groups
+
+
+def write_group(plans):
+    """Escribe un grupo de salidas con un solo lector por fuente.
+
+    Como en merge_files, cada fuente se abre la primera vez que se usa y
+    se cierra después de su último uso en el grupo. Las que otra salida
+    del grupo volverá a usar se quedan abiertas solo hasta MAX_OPEN_SOURCES,
+    así que el número de archivos abiertos no crece con el de fuentes.
+    """
+    steps = [path for p in plans for path, _ in p.selections]
+    last_use = {path: i for i, path in enumerate(steps)}
+    results = []
+    step = 0
+    with ReaderCache() as readers:
+        for p in plans:
+            first, step = step, step + len(p.selections)
+            last_here = {path: i for i, (path, _) in enumerate(p.selections, start=first)}
+            try:
+                with StreamingPdfWriter(p.output) as writer:
+                    reserved = set()
+                    for i, (path, indices) in enumerate(p.selections, start=first):
+                        reader = readers.get(path)
+                        if path not in reserved:
+                            # Todas las páginas que esta salida toma de la fuente, para que
+                            # los enlaces entre ellas no se pierdan
+                            reserved.add(path)
+                            for other, chosen in p.selections:
+                                if other == path:
+                                    writer.reserve_pages(reader, chosen)
+                        writer.add_pages(reader, indices)
+                        if last_here[path] == i:
+                            writer.forget(reader)
+                            if last_use[path] == i or len(readers) > MAX_OPEN_SOURCES:
+                                readers.discard(path)
+                results.append(OutputResult(p.output, len(writer.page_ids), None))
+            except Exception as e:
+                results.append(OutputResult(p.output, 0, f"{e.__class__.__name__}: {e}"))
+            for path in last_here:
+                if last_use[path] < step or len(readers) > MAX_OPEN_SOURCES:
+                    readers.discard(path)
+    return results
+
+
+def run_plans(plans, workers=None, memory_per_worker_mb=None, on_result=None):
+    """Escribe todas las salidas del plan; regresa la lista de OutputResult."""
+    for p in plans:
+        os.makedirs(os.path.dirname(p.output) or '.', exist_ok=True)
+
+    workers = max(1, workers or default_workers())
+    groups = group_plans(plans, workers)
+    results = []
+    if not groups:
+        return results
+
+    def collect(group_results):
+        for result in group_results:
+            results.append(result)
+            if on_result:
+                on_result(result)
+
+    if (workers == 1 or len(groups) == 1) and not memory_per_worker_mb:
+        for group in groups:
+            collect(write_group(group))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(groups)), initializer=init_worker,
+                                 initargs=(memory_per_worker_mb,)) as pool:
+            futures = {pool.submit(write_group, group): group for group in groups}
+            for future in as_completed(futures):
+                try:
+                    collect(future.result())
+                except Exception as e:
+                    # El proceso murió (p. ej. por el límite de memoria): falla todo su grupo
+                    collect([OutputResult(p.output, 0, f"{e.__class__.__name__}: {e}") for p in futures[future]])
+    return results
+
+
+def _print_result(result):
+    if result.error:
+        print(f"Error con {result.output}: {result.error}")
+    else:
+        print(f"{result.output}: {result.pages} páginas")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Une y parte PDFs según un manifiesto (JSON/YAML) o argumentos.")
+    parser.add_argument('manifest', nargs='?', help="manifiesto .json o .yaml")
+    parser.add_argument('sources', nargs='*', help="con -o: PDFs a unir (archivo.pdf:1-3,5)")
+    parser.add_argument('-o', '--output', help="PDF de salida, o patrón de nombres con --split")
+    parser.add_argument('--split', metavar='PDF', help="parte este PDF en varios")
+    parser.add_argument('--every', type=int, default=1, help="páginas por parte con --split")
+    parser.add_argument('-j', '--workers', type=int, default=0, help="procesos en paralelo (0 = todos los núcleos)")
+    parser.add_argument('--memory-per-worker', type=int, metavar='MB', help="límite de memoria por proceso")
+    parser.add_argument('-n', '--dry-run', action='store_true', help="solo muestra el plan")
+    args = parser.parse_args(argv)
+
+    if args.split:
+        manifest = [{'split': args.split, 'every': args.every, 'output': args.output}]
+        base_dir = '.'
+    elif args.output:
+        sources = ([args.manifest] if args.manifest else []) + args.sources
+        if not sources:
+            parser.error("faltan los PDFs a unir")
+        manifest = [{'output': args.output, 'sources': sources}]
+        base_dir = '.'
+    elif args.manifest and not args.sources:
+        manifest = load_manifest(args.manifest)
+        base_dir = os.path.dirname(os.path.abspath(args.manifest))
+    else:
+        parser.error("usa un manifiesto, -o con los PDFs a unir, o --split")
+
+    try:
+        plans = Planner(base_dir).plan(manifest)
+    except ManifestError as e:
+        print(f"Manifiesto inválido: {e}")
+        return 1
+
+    print(f"{len(plans)} PDFs por escribir, de {len({s for p in plans for s, _ in p.selections})} fuentes.")
+    if args.dry_run:
+        for p in plans:
+            pages = sum(len(indices) for _, indices in p.selections)
+            print(f"  {p.output}: {pages} páginas de {', '.join(os.path.basename(s) for s, _ in p.selections)}")
+        return 0
+
+    results = run_plans(plans, workers=args.workers, memory_per_worker_mb=args.memory_per_worker,
+                        on_result=_print_result)
+    failed = [r for r in results if r.error]
+    print(f"\n{len(results) - len(failed)} de {len(results)} PDFs escritos.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,18 +1,166 @@
 ##Esto pretende unir o recortar pdfs
+##
+## Sin argumentos pregunta paso a paso; también se puede usar directo:
+##     python pdf_stitcher.py a.pdf b.pdf:1-3,5 -o unido.pdf [--streaming]
 
 import PyPDF2
+import argparse
 import os
+import re
 
-## Esto cuenta cuántas páginas tiene el pdf que se está manipulando
-def get_pdf_pages(ruta_pdf):
-    with open(ruta_pdf, 'rb') as pdf_file:
+from pdf_dedup import deduplicate_streams
+from pdf_stream_writer import merge_files
+
+## Arriba de esto (sumando los archivos de entrada) se escribe por partes
+STREAMING_MIN_BYTES = 200 * 1024 * 1024
+
+## Guarda un solo lector por archivo durante toda la sesión: contar páginas y
+## después copiarlas (o coser el mismo archivo varias veces) no lo vuelve a leer.
+## El archivo queda abierto y PyPDF2 solo lee del disco los objetos que se piden.
+class ReaderCache:
+    def __init__(self):
+        self._readers = {}  # ruta -> (mtime_ns, tamaño, archivo abierto, lector)
+
+    def get(self, ruta_pdf):
+        ruta_pdf = os.path.abspath(ruta_pdf)
+        stat = os.stat(ruta_pdf)
+        entry = self._readers.get(ruta_pdf)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            return entry[3]
+        if entry is not None:
+            # El archivo cambió desde la última vez: se vuelve a abrir
+            entry[2].close()
+        pdf_file = open(ruta_pdf, 'rb')
         reader = PyPDF2.PdfReader(pdf_file)
-        num_pages = len(reader.pages)
-    return num_pages
+        self._readers[ruta_pdf] = (stat.st_mtime_ns, stat.st_size, pdf_file, reader)
+        return reader
+
+    def page_count(self, ruta_pdf):
+        reader = self.get(ruta_pdf)
+        try:
+            # /Count de la raíz del árbol de páginas: no hace falta cargar cada página
+            return int(reader.trailer['/Root']['/Pages']['/Count'])
+        except (KeyError, TypeError, ValueError):
+            return len(reader.pages)
+
+    def __len__(self):
+        return len(self._readers)
+
+    ## Cierra un archivo que ya no se va a usar (la siguiente vez se vuelve a abrir)
+    def discard(self, ruta_pdf):
+        entry = self._readers.pop(os.path.abspath(ruta_pdf), None)
+        if entry is not None:
+            entry[2].close()
+
+    def close(self):
+        for entry in self._readers.values():
+            entry[2].close()
+        self._readers.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+## Esto cuenta cuántas páginas tiene el pdf que se está manipulando
+def get_pdf_pages(ruta_pdf, readers=None):
+    if readers is not None:
+        return readers.page_count(ruta_pdf)
+    with ReaderCache() as readers:
+        return readers.page_count(ruta_pdf)
+
+
+## Convierte '1-3, 5' en los índices (desde 0) de esas páginas
+def parse_ranges(page_range, num_pages):
+    indices = []
+    for r in page_range.split(','):
+        r = r.strip()
+        if not r:
+            continue
+        if '-' in r:
+            start, end = map(int, r.split('-'))
+        else:
+            start = end = int(r)
+        if not 1 <= start <= end <= num_pages:
+            raise ValueError(f"Rango fuera del documento ({num_pages} páginas): {r}")
+        indices.extend(range(start - 1, end))
+    return indices
+
 
+## Separa 'archivo.pdf:1-3,5' en la ruta y el rango (None si no trae páginas)
+def parse_source(source):
+    # 'C:\\x.pdf' también tiene ':'; solo cuenta si lo que sigue parecen páginas
+    head, sep, tail = source.rpartition(':')
+    if sep and re.fullmatch(r'[\d,\s-]+', tail):
+        return head, tail
+    return source, None
+
+
+## Escribe lo elegido: [(ruta, índices o None para todo), ...]
+def write_selections(selections, ruta_nueva, readers, streaming=False):
+    if streaming:
+        # Cada objeto va directo al archivo: la memoria no crece con el número de documentos
+        return merge_files(selections, ruta_nueva)
 
-def main():
     pdf_writer = PyPDF2.PdfWriter()
+    for ruta_pdf, indices in selections:
+        reader = readers.get(ruta_pdf)
+        for i in range(len(reader.pages)) if indices is None else indices:
+            pdf_writer.add_page(reader.pages[i])
+    # Si se cosió el mismo archivo (o partes de él) más de una vez, lo repetido se guarda una sola vez
+    deduplicate_streams(pdf_writer)
+    with open(ruta_nueva, 'wb') as output_file:
+        pdf_writer.write(output_file)
+    return len(pdf_writer.pages)
+
+
+## Para uniones grandes conviene escribir por partes aunque no se pida
+def should_stream(selections, streaming=None):
+    if streaming is not None:
+        return streaming
+    total = sum(os.path.getsize(ruta_pdf) for ruta_pdf in dict.fromkeys(r for r, _ in selections))
+    return total > STREAMING_MIN_BYTES
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Une o recorta PDFs. Sin argumentos, pregunta paso a paso.")
+    parser.add_argument('sources', nargs='*', help="archivos PDF, opcionalmente con páginas: archivo.pdf:1-3,5")
+    parser.add_argument('-o', '--output', help="PDF de salida")
+    parser.add_argument('--streaming', action='store_true', default=None,
+                        help="escribe conforme copia, con memoria constante (automático para uniones grandes)")
+    parser.add_argument('--in-memory', dest='streaming', action='store_false',
+                        help="arma todo en memoria y junta objetos repetidos antes de escribir")
+    args = parser.parse_args(argv)
+
+    with ReaderCache() as readers:
+        if not args.sources:
+            selections, ruta_nueva = ask_selections(readers)
+        else:
+            if not args.output:
+                parser.error("falta -o/--output")
+            selections, ruta_nueva = [], args.output
+            for source in args.sources:
+                ruta_pdf, page_range = parse_source(source)
+                if not os.path.isfile(ruta_pdf):
+                    print(f"Archivo no encontrado: {ruta_pdf}")
+                    return 1
+                try:
+                    indices = parse_ranges(page_range, get_pdf_pages(ruta_pdf, readers)) if page_range else None
+                except ValueError as e:
+                    print(f"Rango inválido en {source}: {e}")
+                    return 1
+                selections.append((ruta_pdf, indices))
+
+        num_pages = write_selections(selections, ruta_nueva, readers, should_stream(selections, args.streaming))
+
+    print(f"He cosido los archivos ({num_pages} páginas) y los guardé en {ruta_nueva}!")
+    return 0
+
+
+def ask_selections(readers):
+    selections = []
     print("Bienvenido al costurero de PDFs !!!")
 
     while True:
@@ -23,29 +171,21 @@ def main():
             print("Archivo no encontrado, por favor escribe una ruta válida.")
             continue
 
-        num_pages = get_pdf_pages(ruta_pdf)
+        num_pages = get_pdf_pages(ruta_pdf, readers)
         print(f"El archivo tiene {num_pages} páginas.")
 
         choice = input("¿Quieres incluir todo el archivo (todo) o especificar un rango de páginas (rango)?"
                        "(todo/rango): ").strip().lower()
 
         if choice == 'todo':
-            with open(ruta_pdf, 'rb') as pdf_file:
-                reader = PyPDF2.PdfReader(pdf_file)
-                for page in reader.pages:
-                    pdf_writer.add_page(page)
+            selections.append((ruta_pdf, None))
         elif choice == 'rango':
             page_range = input("Introduce los rangos que quieras unir (por ejemplo, 1-3, 5): ").strip()
-            ranges = page_range.split(',')
-            with open(ruta_pdf, 'rb') as pdf_file:
-                reader = PyPDF2.PdfReader(pdf_file)
-                for r in ranges:
-                    if '-' in r:
-                        start, end = map(int, r.split('-'))
-                        for i in range(start - 1, end):
-                            pdf_writer.add_page(reader.pages[i])
-                    else:
-                        pdf_writer.add_page(reader.pages[int(r) - 1])
+            try:
+                selections.append((ruta_pdf, parse_ranges(page_range, num_pages)))
+            except ValueError as e:
+                print(f"Rango inválido: {e}")
+                continue
         else:
             print("Opción invalida, por favor escribe 'todo' o 'rango'.")
             continue
@@ -57,11 +197,8 @@ def main():
 
     # Save the combined PDF
     ruta_nueva = input("Escribe el nombre del nuevo pdf (por ejemplo: ejemplo.pdf) ").strip()
-    with open(ruta_nueva, 'wb') as output_file:
-        pdf_writer.write(output_file)
-
-    print(f"He cosido los archivos y los guardé en {ruta_nueva}!")
+    return selections, ruta_nueva
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,221 @@
+"""
+Escritor de PDF por partes, para unir muchísimos archivos sin
+llenar la memoria.
+
+PdfWriter guarda todas las páginas (con sus imágenes) hasta el
+final y solo entonces escribe. StreamingPdfWriter escribe cada
+objeto al archivo en cuanto lo copia y olvida el original, así
+que la memoria no crece con el número de documentos: del
+documento de origen solo se recuerda qué número recibió cada
+objeto ya copiado, para no escribir dos veces lo que comparten
+sus páginas (fuentes, logos).
+
+Lo usa pdf_stitcher.py para coser.
+"""
+
+import os
+from collections import deque
+
+from PyPDF2 import PdfReader
+from PyPDF2.generic import (ArrayObject, DecodedStreamObject, DictionaryObject, EncodedStreamObject,
+                            IndirectObject, NameObject, NullObject, NumberObject, StreamObject)
+
+PDF_HEADER = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+
+# Claves de la página que no se copian: el padre se reemplaza y las otras
+# apuntan a estructuras del documento original que no se llevan
+EXCLUDED_PAGE_KEYS = ('/Parent', '/StructParents', '/B')
+
+
+class StreamingPdfWriter:
+    """Escribe un PDF objeto por objeto conforme se agregan páginas.
+
+    Uso:
+        with StreamingPdfWriter('salida.pdf') as writer:
+            writer.add_page(reader, 0)
+            writer.forget(reader)  # cuando ya no se usarán más páginas de él
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.tmp_path = output_path + '.tmp'
+        self.file = open(self.tmp_path, 'wb')
+        self.file.write(PDF_HEADER)
+        self.offsets = [None]  # offsets[idnum] = posición del objeto en el archivo
+        self.pages_id = self._reserve()
+        self.catalog_id = self._reserve()
+        self.page_ids = []
+        self._memo = {}  # id(reader) -> {idnum de origen: idnum de salida}
+        self._written = set()  # idnums de salida ya escritos
+
+    def _reserve(self):
+        self.offsets.append(None)
+        return len(self.offsets) - 1
+
+    def _write_object(self, idnum, obj):
+        self._written.add(idnum)
+        self.offsets[idnum] = self.file.tell()
+        self.file.write(f"{idnum} 0 obj\n".encode())
+        obj.write_to_stream(self.file, None)
+        self.file.write(b"\nendobj\n")
+
+    def _copy(self, obj, memo, pending):
+        """Copia un objeto directo; las referencias se renumeran y se encolan para escribirse."""
+        if isinstance(obj, IndirectObject):
+            target = memo.get(obj.idnum)
+            if target is None:
+                resolved = obj.get_object()
+                if isinstance(resolved, DictionaryObject) and resolved.get('/Type') in ('/Page', '/Pages'):
+                    # Enlace a una página que no se va a copiar (las que sí, ya tienen
+                    # número por reserve_pages): copiarla arrastraría todo el árbol
+                    # de páginas del original
+                    return NullObject()
+                target = memo[obj.idnum] = self._reserve()
+                pending.append((target, obj))
+            return IndirectObject(target, 0, self)
+        if isinstance(obj, StreamObject):
+            copy = EncodedStreamObject() if '/Filter' in obj else DecodedStreamObject()
+            copy._data = obj._data
+        elif isinstance(obj, DictionaryObject):
+            copy = DictionaryObject()
+        elif isinstance(obj, ArrayObject):
+            return ArrayObject(self._copy(value, memo, pending) for value in obj)
+        else:
+            return obj
+        for key, value in obj.items():
+            if key != '/Length':
+                copy[key] = self._copy(value, memo, pending)
+        return copy
+
+    def reserve_pages(self, reader, indices):
+        """Da número de salida a las páginas que se van a copiar, antes de copiar ninguna.
+
+        Así un enlace de la página 1 a la 3 apunta a la copia de la 3
+        aunque esta se escriba después, en lugar de quedar en null.
+        """
+        memo = self._memo.setdefault(id(reader), {})
+        for index in indices:
+            ref = reader.pages[index].indirect_reference
+            if ref is not None and ref.idnum not in memo:
+                memo[ref.idnum] = self._reserve()
+
+    def add_page(self, reader, index):
+        """Copia la página index (desde 0) del lector y todo lo que usa."""
+        page = reader.pages[index]
+        memo = self._memo.setdefault(id(reader), {})
+        pending = deque()
+
+        ref = page.indirect_reference
+        page_id = memo.get(ref.idnum) if ref is not None else None
+        if page_id is None or page_id in self._written:
+            # Sin reservar, o la misma página por segunda vez (la primera copia
+            # se queda con los enlaces)
+            page_id = self._reserve()
+            if ref is not None:
+                # Las anotaciones apuntan a su página (/P): que apunten a la copia
+                memo.setdefault(ref.idnum, page_id)
+        copy = DictionaryObject()
+        for key, value in page.items():
+            if key not in EXCLUDED_PAGE_KEYS:
+                copy[key] = self._copy(value, memo, pending)
+        copy[NameObject('/Parent')] = IndirectObject(self.pages_id, 0, self)
+        self._write_object(page_id, copy)
+        self.page_ids.append(page_id)
+
+        # Cada objeto se escribe y se suelta; lo que él referencia se encola
+        while pending:
+            idnum, ref = pending.popleft()
+            self._write_object(idnum, self._copy(ref.get_object(), memo, pending))
+
+        # PyPDF2 guarda cada objeto que ya leyó; lo compartido con otras páginas
+        # se reconoce por el memo, así que no hace falta tenerlo en memoria
+        reader.resolved_objects.clear()
+        return page_id
+
+    def add_pages(self, reader, indices=None):
+        indices = range(len(reader.pages)) if indices is None else indices
+        self.reserve_pages(reader, indices)
+        for index in indices:
+            self.add_page(reader, index)
+
+    def forget(self, reader):
+        """Olvida la numeración de un lector que ya no se va a usar."""
+        self._memo.pop(id(reader), None)
+
+    def close(self):
+        """Escribe el árbol de páginas, el catálogo y la tabla xref, y deja el archivo en su lugar."""
+        pages = DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(IndirectObject(i, 0, self) for i in self.page_ids),
+            NameObject('/Count'): NumberObject(len(self.page_ids)),
+        })
+        self._write_object(self.pages_id, pages)
+        catalog = DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): IndirectObject(self.pages_id, 0, self),
+        })
+        self._write_object(self.catalog_id, catalog)
+
+        xref = self.file.tell()
+        lines = [f"xref\n0 {len(self.offsets)}\n", "0000000000 65535 f \n"]
+        lines += [f"{offset:010d} 00000 n \n" if offset is not None else "0000000000 65535 f \n"
+                  for offset in self.offsets[1:]]
+        self.file.write(''.join(lines).encode())
+        self.file.write(f"trailer\n<< /Size {len(self.offsets)} /Root {self.catalog_id} 0 R >>\n"
+                        f"startxref\n{xref}\n%%EOF\n".encode())
+        self.file.close()
+        os.replace(self.tmp_path, self.output_path)
+        self._memo.clear()
+        self._written.clear()
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def merge_files(selections, output_path):
+    """Une [(ruta, índices de página o None para todas), ...] en output_path.
+
+    Cada archivo se abre una vez aunque aparezca varias veces y se cierra
+    (y se olvida) en cuanto ya no vuelve a aparecer. Al abrirlo se reservan
+    todas las páginas que se van a tomar de él, para que los enlaces entre
+    ellas sobrevivan. Regresa el número de páginas escritas.
+    """
+    last_use = {os.path.abspath(path): n for n, (path, indices) in enumerate(selections)}
+    wanted = {}
+    for path, indices in selections:
+        wanted.setdefault(os.path.abspath(path), []).append(indices)
+    open_files = {}
+    try:
+        with StreamingPdfWriter(output_path) as writer:
+            for n, (path, indices) in enumerate(selections):
+                key = os.path.abspath(path)
+                if key not in open_files:
+                    # Con el archivo abierto (y no una ruta) PyPDF2 lee del disco solo lo que se pide
+                    pdf_file = open(key, 'rb')
+                    reader = PdfReader(pdf_file)
+                    open_files[key] = (pdf_file, reader)
+                    if reader.is_encrypted:
+                        raise ValueError(f"{path} está cifrado")
+                    for chosen in wanted[key]:
+                        writer.reserve_pages(reader, range(len(reader.pages)) if chosen is None else chosen)
+                pdf_file, reader = open_files[key]
+                writer.add_pages(reader, indices)
+                if last_use[key] == n:
+                    writer.forget(reader)
+                    pdf_file.close()
+                    del open_files[key]
+            return len(writer.page_ids)
+    finally:
+        for pdf_file, reader in open_files.values():
+            pdf_file.close()
@@ -0,0 +1,41 @@
+"""
+Límites de recursos para los procesos trabajadores.
+
+Se usan como `initializer` de los ProcessPoolExecutor para que
+un documento gigante no se coma toda la memoria de la máquina.
+"""
+
+import os
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def limit_memory(megabytes):
+    """Limita el espacio de direcciones del proceso actual (y sus hijos).
+
+    Regresa False en plataformas sin el módulo `resource` (Windows),
+    donde el límite simplemente no se aplica.
+    """
+    try:
+        import resource
+    except ImportError:
+        return False
+
+    limit = int(megabytes * 1024 * 1024)
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    return True
+
+
+def init_worker(memory_mb=None, single_threaded=True):
+    """Inicializador común para los trabajadores de un pool."""
+    if memory_mb:
+        limit_memory(memory_mb)
+    if single_threaded:
+        # Cada trabajador ya es un proceso; que tesseract/numpy no abran más hilos
+        os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+        os.environ.setdefault('OMP_NUM_THREADS', '1')